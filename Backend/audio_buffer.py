@@ -0,0 +1,202 @@
+"""Float32 audio buffer used between decoding and export"""
+import io
+import math
+import subprocess
+import numpy as np
+import soundfile as sf
+from pydub import AudioSegment
+from scipy.signal import resample_poly
+
+from wav_reader import MappedWav, is_mappable_wav
+
+
+class AudioBuffer:
+    """Contiguous float32 samples in [-1, 1) with shape (frames, channels)
+
+    Conversion to and from integer PCM happens only at the I/O boundaries
+    (from_segment / to_segment); slicing returns views, not copies.
+    """
+
+    __slots__ = ("samples", "sample_rate")
+
+    def __init__(self, samples: np.ndarray, sample_rate: int):
+        samples = np.ascontiguousarray(samples, dtype=np.float32)
+        if samples.ndim == 1:
+            samples = samples.reshape(-1, 1)
+        self.samples = samples
+        self.sample_rate = sample_rate
+
+    @classmethod
+    def from_segment(cls, audio: AudioSegment) -> "AudioBuffer":
+        """Decode an AudioSegment's integer PCM into a float buffer"""
+        full_scale = float(1 << (8 * audio.sample_width - 1))
+        pcm = np.frombuffer(audio.raw_data, dtype=_pcm_dtype(audio.sample_width))
+        if audio.sample_width == 1:
+            pcm = pcm.astype(np.int16) - 128  # 8-bit WAV is unsigned
+        samples = pcm.reshape(-1, audio.channels).astype(np.float32)
+        samples *= 1.0 / full_scale
+        return cls(samples, audio.frame_rate)
+
+    @classmethod
+    def from_wav(cls, path, start: float = 0.0, end: float = None) -> "AudioBuffer":
+        """Read the [start, end) seconds of a WAV file
+
+        The file is memory-mapped, so only the pages of that range are read;
+        encodings the mapped reader does not handle are decoded with soundfile.
+        """
+        try:
+            with MappedWav(path) as wav:
+                stop = None if end is None else int(end * wav.sample_rate)
+                return cls(wav.samples(int(start * wav.sample_rate), stop), wav.sample_rate)
+        except ValueError:
+            with sf.SoundFile(str(path)) as f:
+                f.seek(int(start * f.samplerate))
+                frames = -1 if end is None else int(end * f.samplerate) - int(start * f.samplerate)
+                return cls(f.read(frames, dtype="float32", always_2d=True), f.samplerate)
+
+    @classmethod
+    def from_pcm16(cls, data: bytes, sample_rate: int, channels: int = 1) -> "AudioBuffer":
+        """Wrap raw little-endian 16-bit PCM"""
+        samples = np.frombuffer(data, dtype="<i2").reshape(-1, channels).astype(np.float32)
+        samples *= 1.0 / 32768.0
+        return cls(samples, sample_rate)
+
+    def to_pcm16(self) -> bytes:
+        """Encode as little-endian 16-bit PCM with saturation"""
+        pcm = np.clip(self.samples * 32768.0, -32768, 32767)
+        return np.rint(pcm).astype("<i2").tobytes()
+
+    def to_segment(self) -> AudioSegment:
+        """Encode as a 16-bit AudioSegment for export"""
+        return AudioSegment(
+            self.to_pcm16(),
+            frame_rate=self.sample_rate,
+            sample_width=2,
+            channels=self.channels
+        )
+
+    def with_samples(self, samples: np.ndarray) -> "AudioBuffer":
+        """New buffer with the same sample rate"""
+        return AudioBuffer(samples, self.sample_rate)
+
+    @property
+    def channels(self) -> int:
+        return self.samples.shape[1]
+
+    @property
+    def duration(self) -> float:
+        """Length in seconds"""
+        return len(self.samples) / self.sample_rate
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def __getitem__(self, key: slice) -> "AudioBuffer":
+        """Frame slice as a zero-copy view"""
+        if not isinstance(key, slice) or key.step not in (None, 1):
+            raise TypeError("AudioBuffer only supports contiguous frame slices")
+        view = AudioBuffer.__new__(AudioBuffer)
+        view.samples = self.samples[key]
+        view.sample_rate = self.sample_rate
+        return view
+
+    def slice_seconds(self, start: float, end: float = None) -> "AudioBuffer":
+        """Zero-copy view of the [start, end) time range"""
+        stop = None if end is None else int(end * self.sample_rate)
+        return self[int(start * self.sample_rate):stop]
+
+    def mono(self) -> np.ndarray:
+        """Channel mix-down (a view when already mono)"""
+        return self.samples[:, 0] if self.channels == 1 else self.samples.mean(axis=1)
+
+    def resample(self, sample_rate: int) -> "AudioBuffer":
+        """Polyphase resampling to another rate (self when already there)"""
+        if sample_rate == self.sample_rate:
+            return self
+        g = math.gcd(sample_rate, self.sample_rate)
+        return AudioBuffer(resample_poly(self.samples, sample_rate // g, self.sample_rate // g, axis=0), sample_rate)
+
+
+def _pcm_dtype(sample_width: int):
+    return {1: np.uint8, 2: "<i2", 4: "<i4"}[sample_width]
+
+
+def decode_audio(data: bytes, channels: int = 1, sample_rate: int = 24000) -> AudioBuffer:
+    """Decode compressed audio (e.g. gTTS MP3) straight from memory
+
+    libsndfile decodes in-process; if it lacks support for the format the
+    bytes are piped through ffmpeg instead. Nothing touches the disk.
+    channels/sample_rate only apply to the ffmpeg fallback.
+    """
+    try:
+        samples, sr = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+        return AudioBuffer(samples, sr)
+    except RuntimeError:
+        pass
+
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+         "-f", "f32le", "-ac", str(channels), "-ar", str(sample_rate), "pipe:1"],
+        input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False
+    )
+    if result.returncode != 0 or not result.stdout:
+        raise RuntimeError(f"Audio decoding failed: {result.stderr.decode(errors='ignore')}")
+    return AudioBuffer(np.frombuffer(result.stdout, dtype="<f4").reshape(-1, channels), sample_rate)
+
+
+def read_audio(path) -> AudioBuffer:
+    """A stored audio file: WAV through the memory-mapped reader, anything else through decode_audio"""
+    if is_mappable_wav(path):
+        return AudioBuffer.from_wav(path)
+    with open(path, "rb") as f:
+        return decode_audio(f.read())
+
+
+# libsndfile maps a 0-1 compression level linearly onto these bitrate ranges (bits/s per channel);
+# MP3 uses MPEG-2 rates below 32 kHz
+_SNDFILE_BITRATES = {
+    "opus": lambda sr: (6000, 256000),
+    "mp3": lambda sr: (8000, 160000) if sr < 32000 else (32000, 320000),
+}
+
+_SNDFILE_FORMATS = {"wav": ("WAV", "PCM_16"), "opus": ("OGG", "OPUS"), "mp3": ("MP3", "MPEG_LAYER_III")}
+
+_FFMPEG_CODECS = {
+    "wav": ["-c:a", "pcm_s16le", "-f", "wav"],
+    "opus": ["-c:a", "libopus", "-application", "voip", "-f", "ogg"],
+    "mp3": ["-c:a", "libmp3lame", "-f", "mp3"],
+    "aac": ["-c:a", "aac", "-f", "adts"],
+}
+
+
+def encode_audio(buf: AudioBuffer, fmt: str, bitrate: int = None) -> bytes:
+    """Encode to wav, opus (Ogg), mp3 or aac (ADTS) in memory at a target bitrate (bits/s)
+
+    libsndfile encodes in-process where it supports the format; otherwise
+    (or for AAC) the samples are piped through ffmpeg.
+    """
+    if fmt in _SNDFILE_FORMATS:
+        container, subtype = _SNDFILE_FORMATS[fmt]
+        options = {}
+        if bitrate and fmt in _SNDFILE_BITRATES:
+            low, high = _SNDFILE_BITRATES[fmt](buf.sample_rate)
+            options["compression_level"] = min(0.99, max(0.0, (high - bitrate / buf.channels) / (high - low)))
+            if fmt == "mp3":
+                options["bitrate_mode"] = "CONSTANT"
+        out = io.BytesIO()
+        try:
+            sf.write(out, buf.samples, buf.sample_rate, format=container, subtype=subtype, **options)
+            return out.getvalue()
+        except (RuntimeError, TypeError, ValueError):
+            pass
+
+    args = _FFMPEG_CODECS[fmt] + (["-b:a", str(bitrate)] if bitrate and fmt != "wav" else [])
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error",
+         "-f", "f32le", "-ac", str(buf.channels), "-ar", str(buf.sample_rate), "-i", "pipe:0",
+         *args, "pipe:1"],
+        input=buf.samples.astype("<f4", copy=False).tobytes(), stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False
+    )
+    if result.returncode != 0 or not result.stdout:
+        raise RuntimeError(f"Audio encoding failed: {result.stderr.decode(errors='ignore')}")
+    return result.stdout
@@ -0,0 +1,122 @@
+"""Age- and size-bounded cleanup of generated audio files
+
+Outputs are tracked in an in-memory index ordered by last access, so a
+sweep only looks at the least recently used entries instead of listing the
+directory. The directory is scanned once, when the janitor is created, to
+adopt files left by a previous run.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import metrics
+
+# Files not accessed for this long are deleted (seconds)
+TEMP_AUDIO_TTL = float(os.environ.get("TEMP_AUDIO_TTL", "3600"))
+
+# Total size kept on disk; least recently used files go first when exceeded
+TEMP_AUDIO_MAX_BYTES = int(os.environ.get("TEMP_AUDIO_MAX_BYTES", str(2 * 1024 ** 3)))
+
+# Seconds between sweeps
+TEMP_AUDIO_SWEEP_INTERVAL = float(os.environ.get("TEMP_AUDIO_SWEEP_INTERVAL", "60"))
+
+
+class AudioJanitor:
+    """LRU index of the files under root with TTL and byte-quota eviction
+
+    on_evict, if given, is called with the name of each deleted file.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        ttl: float = TEMP_AUDIO_TTL,
+        max_bytes: int = TEMP_AUDIO_MAX_BYTES,
+        on_evict: Optional[Callable[[str], None]] = None
+    ):
+        self.root = root
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self._index: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()  # name -> (bytes, last access)
+        self._bytes = 0
+        self._pinned = set()
+        self._lock = threading.Lock()
+        self._scan()
+
+    def _scan(self) -> None:
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith(".tmp"):
+                    continue
+                path = Path(dirpath) / filename
+                st = path.stat()
+                entries.append((max(st.st_atime, st.st_mtime), path.relative_to(self.root).as_posix(), st.st_size))
+        with self._lock:
+            for accessed, name, size in sorted(entries):
+                self._index[name] = (size, accessed)
+                self._bytes += size
+            self._publish()
+
+    def add(self, path: Path) -> None:
+        """Track a newly written file"""
+        name = path.relative_to(self.root).as_posix()
+        size = path.stat().st_size
+        with self._lock:
+            if name in self._pinned:
+                return
+            previous = self._index.pop(name, None)
+            if previous is not None:
+                self._bytes -= previous[0]
+            self._index[name] = (size, time.time())
+            self._bytes += size
+            self._publish()
+
+    def pin(self, names: Iterable[str]) -> None:
+        """Exempt files from eviction (and from the quota), e.g. the phrase library"""
+        with self._lock:
+            for name in names:
+                self._pinned.add(name)
+                entry = self._index.pop(name, None)
+                if entry is not None:
+                    self._bytes -= entry[0]
+            self._publish()
+
+    def touch(self, name: str) -> None:
+        """Record an access, moving the file to the most recently used end"""
+        with self._lock:
+            entry = self._index.get(name)
+            if entry is not None:
+                self._index[name] = (entry[0], time.time())
+                self._index.move_to_end(name)
+
+    def sweep(self) -> List[str]:
+        """Delete expired files, then least recently used ones until under quota"""
+        cutoff = time.time() - self.ttl
+        victims = []
+        with self._lock:
+            while self._index:
+                name, (size, accessed) = next(iter(self._index.items()))
+                if accessed >= cutoff and self._bytes <= self.max_bytes:
+                    break
+                reason = "ttl" if accessed < cutoff else "quota"
+                del self._index[name]
+                self._bytes -= size
+                victims.append(name)
+                metrics.incr(f"temp_audio_evictions_{reason}")
+                metrics.incr("temp_audio_evicted_bytes", size)
+            self._publish()
+
+        for name in victims:
+            if self.on_evict is not None:
+                self.on_evict(name)
+            (self.root / name).unlink(missing_ok=True)
+        return victims
+
+    def _publish(self) -> None:
+        metrics.set_gauge("temp_audio_bytes", self._bytes)
+        metrics.set_gauge("temp_audio_files", len(self._index))
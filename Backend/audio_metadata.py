@@ -0,0 +1,178 @@
+"""Duration, waveform summaries and loudness of stored outputs
+
+Clients draw waveforms and show durations without downloading audio, so
+each output gets a small JSON sidecar (<output>.json) computed from the
+final buffer when it is produced. Files without one (renditions, outputs
+from before sidecars existed) are summarized on first request by reading
+them in blocks, so even long-form outputs are never held in memory whole.
+"""
+import json
+import math
+import os
+import uuid
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import soundfile as sf
+from scipy.signal import sosfilt
+
+from audio_buffer import AudioBuffer, decode_audio
+
+# Bucket counts of the peak/RMS arrays, coarse to fine
+WAVEFORM_RESOLUTIONS = tuple(
+    int(n) for n in os.environ.get("WAVEFORM_RESOLUTIONS", "64,256,1024").split(",")
+)
+
+# Frames per block when summarizing a file
+READ_BLOCK_FRAMES = 1 << 16
+
+# BS.1770 gating blocks are 400 ms, stepped by 100 ms
+_HOP_SECONDS = 0.1
+_ABSOLUTE_GATE_LUFS = -70.0
+
+
+def _k_weighting(sample_rate: int) -> np.ndarray:
+    # BS.1770 pre-filter (high shelf) and RLB high-pass, designed for this sample rate
+    k = math.tan(math.pi * 1681.974450955533 / sample_rate)
+    vh = 10.0 ** (3.999843853973347 / 20.0)
+    vb = vh ** 0.4996667741545416
+    q = 0.7071752369554196
+    a0 = 1.0 + k / q + k * k
+    shelf = [
+        (vh + vb * k / q + k * k) / a0, 2.0 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0,
+        1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0,
+    ]
+    k = math.tan(math.pi * 38.13547087602444 / sample_rate)
+    q = 0.5003270373238773
+    a0 = 1.0 + k / q + k * k
+    high_pass = [1.0, -2.0, 1.0, 1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]
+    return np.array([shelf, high_pass])
+
+
+class MetadataBuilder:
+    """Accumulates the summary of a signal of known length fed in consecutive blocks"""
+
+    def __init__(self, frames: int, sample_rate: int, channels: int):
+        self.frames = frames
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._offset = 0
+        self._peaks = [np.zeros(min(n, frames)) for n in WAVEFORM_RESOLUTIONS]
+        self._squares = [np.zeros(min(n, frames)) for n in WAVEFORM_RESOLUTIONS]
+        self._sos = _k_weighting(sample_rate)
+        self._zi = np.zeros((len(self._sos), 2, channels))
+        self._hop = max(1, int(sample_rate * _HOP_SECONDS))
+        self._hop_energy = []  # K-weighted sum of squares per 100 ms hop
+        self._partial = 0.0
+
+    def feed(self, samples: np.ndarray) -> None:
+        """Add the next (frames, channels) block"""
+        if not len(samples):
+            return
+        frame_peak = np.abs(samples).max(axis=1)
+        frame_square = np.square(samples, dtype=np.float64).mean(axis=1)
+        for peaks, squares in zip(self._peaks, self._squares):
+            # Frame i falls in bucket i * n // frames; reduce each bucket's run within the block
+            n = len(peaks)
+            first = self._offset * n // self.frames
+            last = (self._offset + len(samples) - 1) * n // self.frames
+            buckets = np.arange(first, last + 1)
+            starts = np.maximum(-(-buckets * self.frames // n) - self._offset, 0)
+            np.maximum.at(peaks, buckets, np.maximum.reduceat(frame_peak, starts))
+            np.add.at(squares, buckets, np.add.reduceat(frame_square, starts))
+
+        weighted, self._zi = sosfilt(self._sos, samples, axis=0, zi=self._zi)
+        energy = np.square(weighted).sum(axis=1)
+        position, index = self._offset, 0
+        while index < len(energy):
+            take = min(self._hop - position % self._hop, len(energy) - index)
+            self._partial += float(energy[index:index + take].sum())
+            index += take
+            position += take
+            if position % self._hop == 0:
+                self._hop_energy.append(self._partial)
+                self._partial = 0.0
+        self._offset += len(samples)
+
+    def _loudness(self) -> Optional[float]:
+        # Gated integrated loudness (LUFS); audio shorter than one block is measured whole
+        hops = np.array(self._hop_energy)
+        if len(hops) >= 4:
+            blocks = np.convolve(hops, np.ones(4), mode="valid") / (4 * self._hop)
+        else:
+            blocks = np.array([(hops.sum() + self._partial) / max(1, self._offset)])
+        blocks = blocks[blocks > 0]
+        if not len(blocks):
+            return None
+        levels = -0.691 + 10.0 * np.log10(blocks)
+        blocks = blocks[levels > _ABSOLUTE_GATE_LUFS]
+        if not len(blocks):
+            return None
+        relative_gate = -0.691 + 10.0 * math.log10(blocks.mean()) - 10.0
+        gated = blocks[-0.691 + 10.0 * np.log10(blocks) > relative_gate]
+        return round(-0.691 + 10.0 * math.log10(gated.mean()), 2)
+
+    def result(self) -> dict:
+        peak = max((float(p.max()) for p in self._peaks if len(p)), default=0.0)
+        waveform = []
+        for peaks, squares in zip(self._peaks, self._squares):
+            n = len(peaks)
+            counts = np.diff(np.arange(n + 1) * self.frames // n) if n else np.array([])
+            waveform.append({
+                "buckets": n,
+                "peak": np.round(peaks, 4).tolist(),
+                "rms": np.round(np.sqrt(squares / np.maximum(counts, 1)), 4).tolist(),
+            })
+        return {
+            "duration": round(self.frames / self.sample_rate, 3),
+            "sample_rate": self.sample_rate,
+            "channels": self.channels,
+            "loudness_lufs": self._loudness(),
+            "peak_dbfs": round(20.0 * math.log10(peak), 2) if peak > 0 else None,
+            "waveform": waveform,
+        }
+
+
+def compute_metadata(audio: AudioBuffer) -> dict:
+    """Summary of a whole buffer"""
+    builder = MetadataBuilder(len(audio), audio.sample_rate, audio.channels)
+    builder.feed(audio.samples)
+    return builder.result()
+
+
+def sidecar(path: Path) -> Path:
+    return path.with_name(path.name + ".json")
+
+
+def save_metadata(path: Path, metadata: dict) -> Path:
+    """Write the sidecar of an output atomically and return its path"""
+    target = sidecar(path)
+    tmp = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        tmp.write_text(json.dumps(metadata, separators=(",", ":")))
+        os.replace(tmp, target)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return target
+
+
+def summarize_file(path: Path) -> dict:
+    """Summary of an audio file, read block by block when soundfile can decode it"""
+    try:
+        with sf.SoundFile(str(path)) as f:
+            builder = MetadataBuilder(f.frames, f.samplerate, f.channels)
+            for block in f.blocks(blocksize=READ_BLOCK_FRAMES, dtype="float32", always_2d=True):
+                builder.feed(block)
+            return builder.result()
+    except RuntimeError:
+        # e.g. AAC: decode through ffmpeg
+        return compute_metadata(decode_audio(path.read_bytes()))
+
+
+def load_metadata(path: Path) -> Optional[dict]:
+    """The stored sidecar of an output, if any"""
+    try:
+        return json.loads(sidecar(path).read_text())
+    except (FileNotFoundError, ValueError):
+        return None
@@ -0,0 +1,190 @@
+"""HTTP serving of stored audio: byte ranges, strong validators and zero-copy sends
+
+Players seek with Range requests, so every response advertises byte ranges
+and answers single ranges with 206. ETags are strong and identify the
+file version on disk (inode, size and mtime), so an output regenerated
+under the same content-addressed name (synthesis is not always
+deterministic) never validates against the old bytes, e.g. in If-Range.
+Conditional requests get 304, and the body is
+handed to the server as a file when it supports the ASGI zero-copy or
+path-send extensions, falling back to large chunked reads. Objects held
+in memory are served as memoryview slices.
+"""
+import hashlib
+import os
+import re
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Optional, Tuple
+
+import anyio
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Read size when the server cannot send the file itself
+CHUNK_SIZE = 256 * 1024
+
+# Content-addressed outputs rarely change (only when regenerated after
+# eviction), so clients may reuse them for a while without revalidating
+STORED_CACHE_MAX_AGE = int(os.environ.get("STORED_CACHE_MAX_AGE", "3600"))
+STORED_CACHE_CONTROL = f"public, max-age={STORED_CACHE_MAX_AGE}"
+MUTABLE_CACHE_CONTROL = "no-cache"
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def file_etag(path: Path, st: os.stat_result) -> Tuple[str, bool]:
+    """(strong ETag, stored) for a file; stored is True for digest-named outputs
+
+    Outputs are replaced by rename, so every write gets a new inode and mtime.
+    """
+    version = f"{st.st_ino}-{st.st_size}-{st.st_mtime_ns}"
+    return f'"{hashlib.sha1(version.encode()).hexdigest()}"', bool(_DIGEST_RE.match(path.stem))
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) of a single byte range; None to serve the whole file
+
+    Raises ValueError when the range cannot be satisfied.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if match is None:
+        # Multiple ranges or other units: ignoring Range is always allowed
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("range not satisfiable")
+    return start, end
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class FileRangeResponse(Response):
+    """Sends bytes [start, start + length) of a file"""
+
+    def __init__(self, path: Path, start: int, length: int, status_code: int, headers: dict, media_type: str):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.length = length
+        self.raw_headers = [(k, v) for k, v in self.raw_headers if k != b"content-length"]
+        self.raw_headers.append((b"content-length", str(length).encode("latin-1")))
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"] == "HEAD" or self.length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        extensions = scope.get("extensions") or {}
+        if "http.response.zerocopysend" in extensions:
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend", "file": f,
+                    "offset": self.start, "count": self.length, "more_body": False
+                })
+            return
+        if "http.response.pathsend" in extensions and self.start == 0 and self.length == self.path.stat().st_size:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+            return
+
+        async with await anyio.open_file(self.path, "rb") as f:
+            await f.seek(self.start)
+            remaining = self.length
+            while remaining > 0:
+                chunk = await f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # File shrank underneath us; end the body
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class MemoryRangeResponse(Response):
+    """Sends a slice of an in-memory object without copying it"""
+
+    def __init__(self, data: memoryview, status_code: int, headers: dict, media_type: str):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.data = data
+        self.raw_headers = [(k, v) for k, v in self.raw_headers if k != b"content-length"]
+        self.raw_headers.append((b"content-length", str(len(data)).encode("latin-1")))
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        body = b"" if scope["method"] == "HEAD" else self.data
+        await send({"type": "http.response.body", "body": body, "more_body": False})
+
+
+def _respond(request: Request, size: int, mtime: float, etag: str, stored: bool, body) -> Response:
+    # body(start, length, status, headers) builds the response for the selected bytes
+    headers = {
+        "etag": etag,
+        "last-modified": formatdate(mtime, usegmt=True),
+        "cache-control": STORED_CACHE_CONTROL if stored else MUTABLE_CACHE_CONTROL,
+        "accept-ranges": "bytes",
+    }
+
+    if _not_modified(request, etag, mtime):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            headers["content-range"] = f"bytes {start}-{end}/{size}"
+            return body(start, end - start + 1, 206, headers)
+
+    return body(0, size, 200, headers)
+
+
+def serve_file(request: Request, path: Path, media_type: str) -> Response:
+    """Response for GET/HEAD of a file, honouring Range, If-Range and conditional headers"""
+    st = path.stat()
+    if not stat.S_ISREG(st.st_mode):
+        raise FileNotFoundError(path)
+    etag, stored = file_etag(path, st)
+    return _respond(
+        request, st.st_size, st.st_mtime, etag, stored,
+        lambda start, length, status, headers: FileRangeResponse(path, start, length, status, headers, media_type)
+    )
+
+
+def serve_bytes(request: Request, data: memoryview, mtime: float, etag: str, stored: bool,
+                media_type: str) -> Response:
+    """serve_file for an object held in memory; ranges are zero-copy slices"""
+    return _respond(
+        request, len(data), mtime, etag, stored,
+        lambda start, length, status, headers: MemoryRangeResponse(
+            data[start:start + length], status, headers, media_type
+        )
+    )
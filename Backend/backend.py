@@ -1,13 +1,20 @@
 import os
+import re
 import logging
-from fastapi import FastAPI, UploadFile, File, HTTPException
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydub import AudioSegment
+import numpy as np
 import librosa
 import torch
 import soundfile as sf
 from transformers import Wav2Vec2Processor, Wav2Vec2ForSequenceClassification
+from output_store import OutputStore
+from wav_reader import MappedWav
 
 # ======================
 # Configuration Section
@@ -49,6 +56,15 @@ SUPPORTED_AUDIO_TYPES = [
     "audio/aac", "audio/flac", "audio/ogg", "audio/x-flac"
 ]
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB limit
+TARGET_SAMPLE_RATE = 16000  # Wav2Vec2 expects 16kHz
+
+# Output store of the synthesis server (main.py), readable by /detect
+OUTPUT_STORE_ROOT = Path(os.environ.get("OUTPUT_STORE_ROOT", "temp_audio")).resolve()
+STORED_AUDIO_EXTS = ("wav", "mp3", "opus", "aac")
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+# 16kHz waveforms of recently verified outputs (outputs never change)
+DETECTION_CACHE_ITEMS = int(os.environ.get("DETECTION_CACHE_ITEMS", "32"))
 
 # ======================
 # Model Loading Section
@@ -67,6 +83,79 @@ except Exception as e:
 # Core Functions Section
 # ======================
 
+def load_waveform(file_path: str, start: float = 0.0, end: float = None) -> tuple:
+    """
+    Read a mono float32 window of a WAV file through a memory map
+
+    Only the pages of the [start, end) seconds are read from disk.
+
+    Args:
+        file_path: Path to a PCM or float WAV file
+        start: Window start in seconds
+        end: Window end in seconds (None for the end of the file)
+
+    Returns:
+        (waveform, sample_rate)
+
+    Raises:
+        ValueError: If the file is not a WAV the memory-mapped reader handles
+    """
+    with MappedWav(file_path) as wav:
+        stop = None if end is None else int(end * wav.sample_rate)
+        samples = wav.samples(int(start * wav.sample_rate), stop)
+        sample_rate = wav.sample_rate
+    waveform = samples[:, 0] if samples.shape[1] == 1 else samples.mean(axis=1)
+    return waveform, sample_rate
+
+def load_model_input(file_path: str) -> np.ndarray:
+    """
+    Mono 16kHz waveform of an audio file
+
+    WAV files are read through a memory map; other formats are decoded
+    with librosa.
+
+    Args:
+        file_path: Path to audio file
+
+    Returns:
+        float32 waveform at TARGET_SAMPLE_RATE
+    """
+    try:
+        waveform, sample_rate = load_waveform(file_path)
+    except ValueError:
+        waveform, sample_rate = librosa.load(file_path, sr=None)
+
+    if sample_rate != TARGET_SAMPLE_RATE:
+        waveform = librosa.resample(
+            waveform,
+            orig_sr=sample_rate,
+            target_sr=TARGET_SAMPLE_RATE
+        )
+    return waveform
+
+def classify(waveform: np.ndarray) -> str:
+    """
+    Run the Wav2Vec2 classifier on a 16kHz waveform
+
+    Args:
+        waveform: Mono float32 samples at TARGET_SAMPLE_RATE
+
+    Returns:
+        "real" or "fake" classification result
+    """
+    inputs = processor(
+        waveform,
+        sampling_rate=TARGET_SAMPLE_RATE,
+        return_tensors="pt",
+        padding=True
+    )
+
+    with torch.no_grad():
+        outputs = model(**inputs)
+        prediction = outputs.logits.argmax(dim=1).item()
+
+    return "real" if prediction == 1 else "fake"
+
 def process_audio(file_path: str) -> str:
     """
     Classify audio as real or fake using Wav2Vec2 model
@@ -81,35 +170,80 @@ def process_audio(file_path: str) -> str:
         RuntimeError: If audio processing fails
     """
     try:
-        # Load audio file and ensure proper sample rate
-        waveform, sample_rate = librosa.load(file_path, sr=None)
-        target_sample_rate = 16000  # Wav2Vec2 expects 16kHz
-        
-        if sample_rate != target_sample_rate:
-            waveform = librosa.resample(
-                waveform, 
-                orig_sr=sample_rate, 
-                target_sr=target_sample_rate
-            )
-        
-        # Process audio through the model
-        inputs = processor(
-            waveform, 
-            sampling_rate=target_sample_rate, 
-            return_tensors="pt", 
-            padding=True
-        )
-        
-        with torch.no_grad():
-            outputs = model(**inputs)
-            prediction = outputs.logits.argmax(dim=1).item()
-        
-        return "real" if prediction == 1 else "fake"
+        # Load audio file at the model's sample rate and classify it
+        return classify(load_model_input(file_path))
         
     except Exception as e:
         logging.error(f"Audio processing failed: {str(e)}")
         raise RuntimeError(f"Processing error: {str(e)}")
 
+def resolve_stored_output(output_id: str = None, path: str = None) -> Path:
+    """
+    Locate a stored output of the synthesis server
+
+    Args:
+        output_id: Output digest (the file name in its /temp_audio URL, without extension)
+        path: File path relative to OUTPUT_STORE_ROOT (e.g. the /temp_audio URL path) or absolute within it
+
+    Returns:
+        Absolute path of the output
+
+    Raises:
+        HTTPException: 400 for malformed or out-of-store references, 404 if the output does not exist
+    """
+    if output_id:
+        if not DIGEST_PATTERN.match(output_id):
+            raise HTTPException(status_code=400, detail="output_id must be a 64-character hex digest")
+        for ext in STORED_AUDIO_EXTS:
+            candidate = OUTPUT_STORE_ROOT / OutputStore.relative(output_id, ext)
+            if candidate.is_file():
+                return candidate
+        raise HTTPException(status_code=404, detail="Output not found")
+
+    if not path:
+        raise HTTPException(status_code=400, detail="Provide output_id or path")
+    candidate = (OUTPUT_STORE_ROOT / path).resolve()
+    if OUTPUT_STORE_ROOT not in candidate.parents:
+        raise HTTPException(status_code=400, detail="Path is outside the output store")
+    if not candidate.is_file():
+        raise HTTPException(status_code=404, detail="Output not found")
+    return candidate
+
+_detection_inputs = OrderedDict()  # output name -> 16kHz waveform
+_detection_lock = threading.Lock()
+
+def load_stored_output(output_path: Path) -> np.ndarray:
+    """
+    Mono 16kHz waveform of a stored output, read in place
+
+    A 16kHz WAV rendition produced by the synthesis server is used as-is;
+    otherwise the stored PCM is read and resampled once and kept in a
+    small in-memory cache.
+
+    Args:
+        output_path: Absolute path inside OUTPUT_STORE_ROOT
+
+    Returns:
+        float32 waveform at TARGET_SAMPLE_RATE
+    """
+    name = output_path.relative_to(OUTPUT_STORE_ROOT).as_posix()
+    with _detection_lock:
+        waveform = _detection_inputs.get(name)
+        if waveform is not None:
+            _detection_inputs.move_to_end(name)
+            return waveform
+
+    # Same key as main.py's transcode(store, name, "wav", None, 16000)
+    digest = OutputStore.request_key("transcode", name, "wav", None, TARGET_SAMPLE_RATE)
+    rendition = OUTPUT_STORE_ROOT / OutputStore.relative(digest, "wav")
+    waveform = load_model_input(str(rendition if rendition.is_file() else output_path))
+
+    with _detection_lock:
+        _detection_inputs[name] = waveform
+        while len(_detection_inputs) > DETECTION_CACHE_ITEMS:
+            _detection_inputs.popitem(last=False)
+    return waveform
+
 def convert_to_wav(input_path: str, output_path: str):
     """
     Convert any audio file to standardized WAV format at 16kHz
@@ -122,17 +256,20 @@ def convert_to_wav(input_path: str, output_path: str):
         RuntimeError: If conversion fails
     """
     try:
-        # Load audio file using pydub
-        audio = AudioSegment.from_file(input_path)
-        
-        # Export as WAV format
-        audio.export(output_path, format="wav")
+        try:
+            # WAV uploads are read in place, without a decoder or intermediate file
+            waveform, sample_rate = load_waveform(input_path)
+        except ValueError:
+            # Load audio file using pydub
+            audio = AudioSegment.from_file(input_path).set_channels(1)
+            full_scale = float(1 << (8 * audio.sample_width - 1))
+            waveform = np.array(audio.get_array_of_samples(), dtype=np.float32) / full_scale
+            sample_rate = audio.frame_rate
         
         # Ensure 16kHz sample rate using librosa
-        waveform, sample_rate = librosa.load(output_path, sr=None)
-        if sample_rate != 16000:
-            waveform = librosa.resample(waveform, orig_sr=sample_rate, target_sr=16000)
-            sf.write(output_path, waveform, 16000)
+        if sample_rate != TARGET_SAMPLE_RATE:
+            waveform = librosa.resample(waveform, orig_sr=sample_rate, target_sr=TARGET_SAMPLE_RATE)
+        sf.write(output_path, waveform, TARGET_SAMPLE_RATE)
             
     except Exception as e:
         logging.error(f"Audio conversion failed: {str(e)}")
@@ -234,6 +371,39 @@ async def upload_file(file: UploadFile = File(...)):
                 except Exception as e:
                     logging.warning(f"Failed to delete temp file {temp_file}: {str(e)}")
 
+@app.post("/detect")
+async def detect_stored_output(output_id: str = Form(None), path: str = Form(None)):
+    """
+    Classify an output of the synthesis server without re-uploading it
+
+    Process flow:
+    1. Resolve output_id (digest) or path within OUTPUT_STORE_ROOT
+    2. Read the stored PCM in place (or its cached 16kHz rendition)
+    3. Process through model
+    4. Return classification result
+    """
+    output_path = resolve_stored_output(output_id, path)
+    try:
+        result = classify(load_stored_output(output_path))
+    except FileNotFoundError:
+        # Evicted by the synthesis server in the meantime
+        raise HTTPException(status_code=404, detail="Output not found")
+    except Exception as e:
+        logging.error(f"Detection failed for {output_path}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "error": "Processing failed",
+                "message": str(e)
+            }
+        )
+
+    return {
+        "result": result,
+        "output": output_path.relative_to(OUTPUT_STORE_ROOT).as_posix(),
+        "processing": "successful"
+    }
+
 # ======================
 # Server Startup
 # ======================
@@ -0,0 +1,128 @@
+"""Download throughput of /temp_audio under many concurrent clients
+
+Serves a directory of WAV-sized files through serve_file, from the
+in-memory hot tier and, for comparison, through Starlette's StaticFiles,
+with uvicorn in a separate process, then
+fetches them from CONCURRENCY clients at once; a share of requests are
+Range requests as issued by seeking players.
+
+Run from the Backend directory:  python -m benchmarks.bench_audio_serving
+"""
+import asyncio
+import multiprocessing
+import os
+import random
+import socket
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.staticfiles import StaticFiles
+
+from audio_serving import serve_bytes, serve_file
+from hot_cache import HotAudioCache
+
+FILES = 20
+FILE_BYTES = 2 * 1024 * 1024  # about 45 s of 24 kHz 16-bit mono
+CONCURRENCY = 100
+REQUESTS = 2000
+RANGE_SHARE = 0.3
+
+
+def make_app(root: Path, mode: str) -> FastAPI:
+    app = FastAPI()
+    if mode == "static":
+        app.mount("/temp_audio", StaticFiles(directory=root))
+    elif mode == "disk":
+        @app.get("/temp_audio/{name}")
+        async def get_audio(name: str, request: Request):
+            return serve_file(request, root / name, "audio/wav")
+    else:
+        cache = HotAudioCache(root, max_bytes=FILES * FILE_BYTES, max_item_bytes=FILE_BYTES)
+        for path in root.iterdir():
+            cache.add(path)
+
+        @app.get("/temp_audio/{name}")
+        async def get_audio(name: str, request: Request):
+            entry = cache.get(name)
+            return serve_bytes(request, entry.data, entry.mtime, entry.etag, entry.stored, "audio/wav")
+    return app
+
+
+def serve(root: Path, mode: str, port: int) -> None:
+    uvicorn.run(make_app(root, mode), host="127.0.0.1", port=port, log_level="error")
+
+
+def start_server(root: Path, mode: str, probe: str) -> tuple:
+    # Separate process so the load generator does not compete for the GIL
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    process = multiprocessing.Process(target=serve, args=(root, mode, port), daemon=True)
+    process.start()
+    base_url = f"http://127.0.0.1:{port}"
+    while True:
+        try:
+            httpx.head(f"{base_url}/temp_audio/{probe}")
+            return process, base_url
+        except httpx.TransportError:
+            time.sleep(0.05)
+
+
+async def load(base_url: str, names: list) -> tuple:
+    rng = random.Random(0)
+    plan = []
+    for _ in range(REQUESTS):
+        headers = {}
+        if rng.random() < RANGE_SHARE:
+            start = rng.randrange(FILE_BYTES - 65536)
+            headers["Range"] = f"bytes={start}-{start + 65535}"
+        plan.append((rng.choice(names), headers))
+
+    received = 0
+    latencies = []
+    queue = asyncio.Queue()
+    for item in plan:
+        queue.put_nowait(item)
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal received
+        while not queue.empty():
+            name, headers = queue.get_nowait()
+            started = time.perf_counter()
+            response = await client.get(f"{base_url}/temp_audio/{name}", headers=headers)
+            latencies.append(time.perf_counter() - started)
+            received += len(response.content)
+
+    limits = httpx.Limits(max_connections=CONCURRENCY)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(CONCURRENCY)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return elapsed, received, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        names = []
+        for i in range(FILES):
+            name = f"{i:064x}.wav"
+            (root / name).write_bytes(os.urandom(FILE_BYTES))
+            names.append(name)
+
+        for label, mode in (("StaticFiles", "static"), ("serve_file", "disk"), ("hot tier", "memory")):
+            process, base_url = start_server(root, mode, names[0])
+            elapsed, received, p50, p99 = asyncio.run(load(base_url, names))
+            process.terminate()
+            process.join()
+            print(f"{label:12s} {REQUESTS / elapsed:7.1f} req/s  {received / elapsed / 1e6:8.1f} MB/s  "
+                  f"p50 {p50 * 1000:6.1f} ms  p99 {p99 * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
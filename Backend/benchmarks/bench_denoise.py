@@ -0,0 +1,34 @@
+"""Throughput and peak-memory benchmark for the streaming spectral gate
+
+Run from the Backend directory:  python -m benchmarks.bench_denoise
+"""
+import time
+import tracemalloc
+import numpy as np
+
+from denoise import SpectralGate
+
+SAMPLE_RATE = 24000
+CHUNK_SECONDS = 0.5
+
+
+def bench(seconds: int) -> None:
+    rng = np.random.default_rng(0)
+    chunk = int(SAMPLE_RATE * CHUNK_SECONDS)
+    gate = SpectralGate()
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(int(seconds / CHUNK_SECONDS)):
+        gate.process(rng.standard_normal(chunk, dtype=np.float32) * 0.1)
+    gate.flush()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{seconds:5d}s audio: {seconds / elapsed:8.1f}x realtime, peak {peak / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    for seconds in (10, 60, 600):
+        bench(seconds)
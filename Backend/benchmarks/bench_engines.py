@@ -0,0 +1,41 @@
+"""Per-request latency of the available TTS engines
+
+gTTS runs against the local stand-in server; the offline VITS engine is
+included when Coqui TTS and its model are available.
+Run from the Backend directory:  python -m benchmarks.bench_engines
+"""
+import time
+
+from gtts_engine import GTTSEngine
+from tts_engines import LocalTTSEngine, ToneEngine
+from benchmarks.gtts_standin import StandInServer
+
+TEXTS = [
+    "Hello and welcome.",
+    "Your recording has been saved. You can play it back from the library at any time.",
+    ("This is a longer paragraph that spans several sentences. It is meant to resemble "
+     "a typical request. Each sentence becomes one chunk for the remote engine. ") * 3,
+]
+REPEATS = 3
+
+
+def bench(engine, lang: str = "en") -> None:
+    for text in TEXTS:
+        started = time.perf_counter()
+        for _ in range(REPEATS):
+            audio = engine.synthesize(text, lang)
+        elapsed = (time.perf_counter() - started) / REPEATS
+        print(f"{engine.name:6s} {len(text):5d} chars: {elapsed * 1000:8.1f} ms ({audio.duration:.1f}s audio)")
+
+
+if __name__ == "__main__":
+    bench(ToneEngine())
+    with StandInServer(latency=0.15, jitter=0.1) as server:
+        # A fresh cache per pass would hide repeats; keep it off to measure fetches
+        engine = GTTSEngine(url=server.url)
+        engine.cache.max_bytes = 0
+        bench(engine)
+    try:
+        bench(LocalTTSEngine())
+    except ImportError as e:
+        print(f"local  skipped ({e})")
@@ -0,0 +1,44 @@
+"""Response size and encode time per output format for a minute of speech-like audio
+
+Run from the Backend directory:  python -m benchmarks.bench_formats
+"""
+import time
+import numpy as np
+
+from audio_buffer import AudioBuffer, encode_audio
+from output_formats import OUTPUT_FORMATS
+
+SAMPLE_RATE = 24000
+SECONDS = 60
+
+
+def speech_like(seconds: float, sr: int) -> AudioBuffer:
+    """Harmonic voiced segments with pauses and a little noise"""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * sr)) / sr
+    f0 = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 12))
+    envelope = (np.sin(2 * np.pi * 2.5 * t) > -0.3).astype(np.float32)
+    samples = 0.2 * voiced * envelope + 0.005 * rng.standard_normal(len(t))
+    return AudioBuffer(samples.astype(np.float32), sr)
+
+
+def main() -> None:
+    audio = speech_like(SECONDS, SAMPLE_RATE)
+    wav_bytes = len(encode_audio(audio, "wav"))
+    for fmt, spec in OUTPUT_FORMATS.items():
+        source = audio.resample(spec.sample_rate) if spec.sample_rate else audio
+        started = time.perf_counter()
+        try:
+            data = encode_audio(source, fmt, spec.bitrate)
+        except (RuntimeError, FileNotFoundError) as e:
+            print(f"{fmt:5s} unavailable: {str(e).strip()[:60]}")
+            continue
+        elapsed = time.perf_counter() - started
+        print(f"{fmt:5s} {len(data) / 1024:8.1f} KiB  {wav_bytes / len(data):5.1f}x smaller than WAV  "
+              f"encode {elapsed * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
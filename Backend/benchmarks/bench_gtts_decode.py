@@ -0,0 +1,65 @@
+"""Per-request latency and I/O syscalls: temp-file MP3 decode vs in-memory decode
+
+Uses a locally encoded MP3 in place of a gTTS response, so no network is needed.
+Run from the Backend directory:  python -m benchmarks.bench_gtts_decode
+"""
+import io
+import os
+import tempfile
+import time
+import numpy as np
+import soundfile as sf
+from pydub import AudioSegment
+
+from audio_buffer import AudioBuffer, decode_audio
+
+SAMPLE_RATE = 24000
+REQUESTS = 50
+
+
+def make_mp3(seconds: float = 5.0) -> bytes:
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    out = io.BytesIO()
+    sf.write(out, 0.3 * np.sin(2 * np.pi * 220 * t), SAMPLE_RATE, format="MP3")
+    return out.getvalue()
+
+
+def io_syscalls():
+    """(read syscalls, write syscalls) for this process, if the kernel exposes them"""
+    try:
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(": ") for line in f.read().splitlines())
+        return int(fields["syscr"]), int(fields["syscw"])
+    except OSError:
+        return 0, 0
+
+
+def temp_file_path(data: bytes, directory: str) -> AudioBuffer:
+    # The previous generate_voice flow: save, re-read via ffmpeg, delete
+    mp3_path = os.path.join(directory, "bench.mp3")
+    with open(mp3_path, "wb") as f:
+        f.write(data)
+    audio = AudioBuffer.from_segment(AudioSegment.from_mp3(mp3_path))
+    os.remove(mp3_path)
+    return audio
+
+
+def run(name, fn) -> None:
+    reads, writes = io_syscalls()
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        fn()
+    elapsed = (time.perf_counter() - started) / REQUESTS
+    end_reads, end_writes = io_syscalls()
+    print(f"{name:10s} {elapsed * 1000:8.2f} ms/request, "
+          f"{(end_reads - reads) / REQUESTS:6.1f} read + {(end_writes - writes) / REQUESTS:6.1f} write syscalls/request")
+
+
+if __name__ == "__main__":
+    data = make_mp3()
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            run("temp file", lambda: temp_file_path(data, directory))
+        except (OSError, RuntimeError) as e:
+            print(f"temp file  skipped ({e})")
+    run("in memory", lambda: decode_audio(data))
@@ -0,0 +1,28 @@
+"""Sequential vs concurrent gTTS chunk fetching against the local stand-in server
+
+Run from the Backend directory:  python -m benchmarks.bench_gtts_fetch
+"""
+import time
+
+from gtts_engine import GTTSEngine
+from benchmarks.gtts_standin import StandInServer
+
+# Distinct sentences, so every chunk is a separate fetch (no cache or in-flight sharing)
+TEXT = " ".join(f"Sentence number {i} of the benchmark text, read aloud once." for i in range(80))
+
+
+def bench(server: StandInServer, concurrency: int) -> None:
+    engine = GTTSEngine(url=server.url, max_concurrency=concurrency)
+    engine.cache.max_bytes = 0
+    chunks = engine.tokenize(TEXT, "en")
+    started = time.perf_counter()
+    audio = engine.synthesize(TEXT, "en", chunks)
+    elapsed = time.perf_counter() - started
+    print(f"concurrency {concurrency:2d}: {len(chunks)} chunks in {elapsed:6.2f}s "
+          f"({audio.duration:.1f}s of audio)")
+
+
+if __name__ == "__main__":
+    with StandInServer(latency=0.1) as server:
+        for concurrency in (1, 4, 8, 16):
+            bench(server, concurrency)
@@ -0,0 +1,35 @@
+"""Chunk tail latency with and without hedged requests
+
+The stand-in server stalls 3% of requests and fails 2%.
+Run from the Backend directory:  python -m benchmarks.bench_gtts_hedging
+"""
+import time
+import numpy as np
+
+from gtts_engine import GTTSEngine
+from benchmarks.gtts_standin import StandInServer
+
+CHUNKS = 300
+
+
+def bench(server: StandInServer, hedge_percentile: float) -> None:
+    engine = GTTSEngine(url=server.url, hedge_percentile=hedge_percentile, chunk_deadline=5.0)
+    engine.cache.max_bytes = 0
+    latencies, failures = [], 0
+    for i in range(CHUNKS):
+        started = time.perf_counter()
+        try:
+            engine.fetch_chunk(f"Sentence number {i}.", "en")
+        except Exception:
+            failures += 1
+        latencies.append(time.perf_counter() - started)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    label = f"hedge at p{hedge_percentile:g}" if hedge_percentile else "no hedging"
+    print(f"{label:14s} p50 {p50 * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms  "
+          f"p99 {p99 * 1000:7.1f} ms  failures {failures}")
+
+
+if __name__ == "__main__":
+    with StandInServer(latency=0.03, jitter=0.02, fail_rate=0.02, slow_rate=0.03, slow_latency=1.5) as server:
+        bench(server, 0)
+        bench(server, 95)
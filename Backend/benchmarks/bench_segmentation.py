@@ -0,0 +1,54 @@
+"""Normalization + segmentation time for 5000-character inputs in every gTTS language
+
+Run from the Backend directory:  python -m benchmarks.bench_segmentation
+"""
+import time
+
+from text_segmentation import ENGINE_CHUNK_CHARS, segment_text
+
+# A sentence in the script each language is written in
+SAMPLES = {
+    "zh": "这是一个用于测试的句子，包含一些常见的汉字。",
+    "ja": "これはテスト用の文章です、よろしくお願いします。",
+    "ko": "이것은 테스트를 위한 문장입니다. ",
+    "hi": "यह परीक्षण के लिए एक वाक्य है, इसे ध्यान से पढ़ें। ",
+    "mr": "हे चाचणीसाठी एक वाक्य आहे। ",
+    "bn": "এটি পরীক্ষার জন্য একটি বাক্য। ",
+    "pa": "ਇਹ ਜਾਂਚ ਲਈ ਇੱਕ ਵਾਕ ਹੈ। ",
+    "gu": "આ પરીક્ષણ માટેનું એક વાક્ય છે। ",
+    "ta": "இது ஒரு சோதனை வாக்கியம். ",
+    "te": "ఇది ఒక పరీక్ష వాక్యం. ",
+    "kn": "ಇದು ಒಂದು ಪರೀಕ್ಷಾ ವಾಕ್ಯ. ",
+    "ml": "ഇത് ഒരു പരീക്ഷണ വാക്യമാണ്. ",
+    "ar": "هذه جملة للاختبار، اقرأها بعناية؟ ",
+    "ur": "یہ جانچ کے لیے ایک جملہ ہے۔ ",
+    "fa": "این یک جمله برای آزمایش است. ",
+    "he": "זהו משפט לבדיקה, קרא אותו בעיון. ",
+    "el": "Αυτή είναι μια πρόταση για δοκιμή; ",
+    "ru": "Это предложение для проверки, прочитайте его внимательно. ",
+    "uk": "Це речення для перевірки. ",
+    "th": "นี่คือประโยคสำหรับการทดสอบ ",
+}
+DEFAULT_SAMPLE = "This is a sentence for testing, read it carefully. Dr. Smith agrees! "
+REPEATS = 20
+
+
+def bench(lang: str) -> None:
+    sample = SAMPLES.get(lang.split("-")[0], DEFAULT_SAMPLE)
+    text = (sample * (5000 // len(sample) + 1))[:5000]
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        segment_text.cache_clear()
+        chunks = segment_text(text, lang, ENGINE_CHUNK_CHARS["gtts"])
+    cold = (time.perf_counter() - started) / REPEATS
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        segment_text(text, lang, ENGINE_CHUNK_CHARS["gtts"])
+    warm = (time.perf_counter() - started) / REPEATS
+    print(f"{lang:6s} {len(chunks):4d} chunks  cold {cold * 1000:7.2f} ms  memoized {warm * 1e6:6.1f} us")
+
+
+if __name__ == "__main__":
+    from main import STANDARD_LANGUAGES
+    for lang in STANDARD_LANGUAGES:
+        bench(lang)
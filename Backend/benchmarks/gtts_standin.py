@@ -0,0 +1,97 @@
+"""Local stand-in for the gTTS translate endpoint
+
+Answers batchexecute POSTs in the same line format gTTS parses, returning an
+MP3 tone whose length follows the chunk's text. Latency and failures can be
+injected per request.
+"""
+import base64
+import io
+import json
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import soundfile as sf
+
+SAMPLE_RATE = 24000
+
+
+def tone_mp3(seconds: float) -> bytes:
+    t = np.arange(max(1, int(SAMPLE_RATE * seconds))) / SAMPLE_RATE
+    out = io.BytesIO()
+    sf.write(out, 0.3 * np.sin(2 * np.pi * 220 * t), SAMPLE_RATE, format="MP3")
+    return out.getvalue()
+
+
+class StandInServer:
+    """Threaded HTTP server with configurable latency, jitter and failure rate
+
+    slow_rate/slow_latency add an occasional long delay to model tail latency.
+    script gives the outcome ("ok", "slow" or "fail") of the first requests in
+    arrival order, before the random rates apply.
+    """
+
+    def __init__(self, latency: float = 0.1, jitter: float = 0.0, fail_rate: float = 0.0,
+                 slow_rate: float = 0.0, slow_latency: float = 2.0, script=()):
+        self.script = list(script)
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_rate = fail_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/_/TranslateWebserverUi/data/batchexecute"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+                with server._lock:
+                    server.requests += 1
+                    outcome = server.script.pop(0) if server.script else None
+                delay = server.latency + random.uniform(0, server.jitter)
+                if outcome == "slow" or (outcome is None and random.random() < server.slow_rate):
+                    delay = server.slow_latency
+                time.sleep(delay)
+                if outcome == "fail" or (outcome is None and random.random() < server.fail_rate):
+                    self.send_response(503)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                rpc = json.loads(urllib.parse.unquote(body[len("f.req="):].rstrip("&")))
+                text = json.loads(rpc[0][0][1])[0]
+                audio = base64.b64encode(tone_mp3(0.06 * len(text))).decode("ascii")
+                payload = (")]}'\n\n" + '[["wrb.fr","jQ1olc","[\\"' + audio + '\\"]",null,null,null,"generic"]]\n').encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
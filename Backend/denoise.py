@@ -0,0 +1,332 @@
+"""Noise-floor estimation used to decide how much noise reduction a clip needs"""
+from collections import OrderedDict
+from typing import Callable, NamedTuple, Optional
+import threading
+import numpy as np
+
+import metrics
+
+# Frame length used by the estimator (seconds)
+FRAME_SECONDS = 0.02
+
+# A clip whose quietest frames sit below this level has no audible noise floor
+SILENT_FLOOR_DB = -65.0
+
+# SNR thresholds (dB) for skipping / lightly applying spectral gating
+CLEAN_SNR_DB = 40.0
+LIGHT_SNR_DB = 25.0
+
+# prop_decrease passed to noisereduce for each strength
+PROP_DECREASE = {
+    "skip": 0.0,
+    "light": 0.5,
+    "full": 0.75,
+}
+
+# Level of a frame whose RMS is 0 (the estimator adds 1e-10 before taking the log)
+_MIN_LEVEL_DB = -200.0
+
+
+class NoiseDecision(NamedTuple):
+    """Outcome of the noise-floor estimate for a single clip"""
+    strength: str
+    prop_decrease: float
+    noise_floor_db: float
+    snr_db: float
+
+
+def estimate_noise_floor(samples: np.ndarray, sr: int, full_scale: float = 1.0):
+    """Return (noise_floor_db, signal_level_db) in dBFS from frame RMS percentiles"""
+    frame = max(1, int(sr * FRAME_SECONDS))
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        # Too short to measure: report the level of digital silence (the 1e-10 RMS floor)
+        return _MIN_LEVEL_DB, _MIN_LEVEL_DB
+
+    frames = np.asarray(samples[:n_frames * frame], dtype=np.float32).reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(np.square(frames / full_scale), axis=1)) + 1e-10
+    levels = 20.0 * np.log10(rms)
+    noise_floor_db, signal_db = np.percentile(levels, [10, 95])
+    return float(noise_floor_db), float(signal_db)
+
+
+def decide_noise_reduction(samples: np.ndarray, sr: int, full_scale: float = 1.0) -> NoiseDecision:
+    """Choose whether spectral gating is needed and how aggressive it should be"""
+    noise_floor_db, signal_db = estimate_noise_floor(samples, sr, full_scale)
+    snr_db = signal_db - noise_floor_db
+
+    if noise_floor_db <= SILENT_FLOOR_DB or snr_db >= CLEAN_SNR_DB:
+        strength = "skip"
+    elif snr_db >= LIGHT_SNR_DB:
+        strength = "light"
+    else:
+        strength = "full"
+
+    return NoiseDecision(strength, PROP_DECREASE[strength], noise_floor_db, snr_db)
+
+
+class NoiseProfile(NamedTuple):
+    """Per-frequency-bin noise statistics in dB"""
+    mean_db: np.ndarray
+    std_db: np.ndarray
+    n_frames: int
+
+
+class SpectralGate:
+    """Streaming stationary spectral gate with constant memory use
+
+    Audio is fed in arbitrary chunks through process(); complete STFT frames
+    are gated in blocks of up to block_frames using preallocated work arrays.
+    Output lags input by n_fft - hop_length samples until flush() is called.
+    The noise profile is a running per-bin mean/std of frame magnitudes in dB,
+    updated as audio arrives unless a fixed profile is set with set_profile().
+    """
+
+    def __init__(
+        self,
+        n_fft: int = 1024,
+        hop_length: int = 256,
+        prop_decrease: float = 0.75,
+        n_std_thresh: float = 1.5,
+        block_frames: int = 64,
+    ):
+        if n_fft % hop_length:
+            raise ValueError("n_fft must be a multiple of hop_length")
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.prop_decrease = prop_decrease
+        self.n_std_thresh = n_std_thresh
+        self.block_frames = block_frames
+        self.latency = n_fft - hop_length
+
+        # Periodic Hann analysis window, synthesis window normalised for overlap-add
+        self.window = np.hanning(n_fft + 1)[:-1].astype(np.float32)
+        overlap = np.square(self.window).reshape(-1, hop_length).sum(axis=0)
+        self.synthesis_window = (self.window / np.tile(overlap, n_fft // hop_length)).astype(np.float32)
+
+        n_bins = n_fft // 2 + 1
+        span = self.latency + block_frames * hop_length
+        self._buf = np.zeros(span, dtype=np.float32)
+        self._ola = np.zeros(span + hop_length, dtype=np.float32)
+        self._frames = np.empty((block_frames, n_fft), dtype=np.float32)
+        self._mag = np.empty((block_frames, n_bins), dtype=np.float32)
+        self._db = np.empty((block_frames, n_bins), dtype=np.float32)
+        self._mask = np.empty((block_frames, n_bins), dtype=np.float32)
+        self._smooth = np.empty((block_frames, n_bins), dtype=np.float32)
+        self._gate = np.empty((block_frames, n_bins), dtype=bool)
+        self._thresh = np.empty(n_bins, dtype=np.float32)
+
+        self._mean = np.zeros(n_bins, dtype=np.float64)
+        self._m2 = np.zeros(n_bins, dtype=np.float64)
+        self.reset_profile()
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear buffered audio so the gate can start a new stream"""
+        self._buf[:self.latency] = 0.0
+        self._buf_len = self.latency
+        self._ola[:] = 0.0
+
+    def reset_profile(self) -> None:
+        """Forget the noise statistics and go back to estimating them on the fly"""
+        self._count = 0
+        self._mean[:] = 0.0
+        self._m2[:] = 0.0
+        self._frozen = False
+
+    def set_profile(self, profile: NoiseProfile) -> None:
+        """Gate against a fixed, previously estimated noise profile"""
+        self._count = max(profile.n_frames, 1)
+        self._mean[:] = profile.mean_db
+        self._m2[:] = np.square(profile.std_db, dtype=np.float64) * self._count
+        self._frozen = True
+
+    def estimate_profile(self, samples: np.ndarray) -> NoiseProfile:
+        """Estimate a noise profile from a whole clip without producing output"""
+        self.reset_profile()
+        samples = np.asarray(samples, dtype=np.float32)
+        hop = self.hop_length
+        n_total = max(0, (len(samples) - self.n_fft) // hop + 1)
+        for start in range(0, n_total, self.block_frames):
+            n = min(self.block_frames, n_total - start)
+            span = samples[start * hop:(start + n - 1) * hop + self.n_fft]
+            windows = np.lib.stride_tricks.sliding_window_view(span, self.n_fft)[::hop]
+            self._update_profile(self._analyse(windows, n)[0])
+        std = np.sqrt(self._m2 / max(self._count, 1))
+        profile = NoiseProfile(self._mean.astype(np.float32), std.astype(np.float32), self._count)
+        self.reset_profile()
+        return profile
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        """Gate a chunk of float samples and return whatever output is ready"""
+        chunk = np.asarray(chunk, dtype=np.float32)
+        out = []
+        pos = 0
+        while pos < len(chunk):
+            take = min(len(chunk) - pos, len(self._buf) - self._buf_len)
+            self._buf[self._buf_len:self._buf_len + take] = chunk[pos:pos + take]
+            self._buf_len += take
+            pos += take
+            n = (self._buf_len - self.latency) // self.hop_length
+            if n == self.block_frames or (pos == len(chunk) and n > 0):
+                out.append(self._process_frames(n))
+        if not out:
+            return np.zeros(0, dtype=np.float32)
+        return out[0] if len(out) == 1 else np.concatenate(out)
+
+    def flush(self) -> np.ndarray:
+        """Pad the stream with silence and return the remaining output"""
+        partial = (self._buf_len - self.latency) % self.hop_length
+        pad = (self.hop_length - partial) % self.hop_length + self.latency
+        out = self.process(np.zeros(pad, dtype=np.float32))
+        self.reset()
+        return out
+
+    def reduce(self, samples: np.ndarray) -> np.ndarray:
+        """Gate a whole clip and return output aligned with the input"""
+        self.reset()
+        out = np.concatenate([self.process(samples), self.flush()])
+        return out[self.latency:self.latency + len(samples)]
+
+    def _update_profile(self, db: np.ndarray) -> None:
+        # Chan et al. parallel update of the running per-bin mean/variance
+        n_b = len(db)
+        if n_b == 0:
+            return
+        mean_b = db.mean(axis=0, dtype=np.float64)
+        m2_b = db.var(axis=0, dtype=np.float64) * n_b
+        total = self._count + n_b
+        delta = mean_b - self._mean
+        self._mean += delta * (n_b / total)
+        self._m2 += m2_b + np.square(delta) * (self._count * n_b / total)
+        self._count = total
+
+    def _analyse(self, windows: np.ndarray, n: int):
+        # Windowed frames -> spectrum and magnitude in dB (silent frames dropped from stats)
+        frames = self._frames[:n]
+        np.multiply(windows, self.window, out=frames)
+        spec = np.fft.rfft(frames, axis=1)
+        mag, db = self._mag[:n], self._db[:n]
+        np.abs(spec, out=mag)
+        np.maximum(mag, 1e-4, out=db)
+        np.log10(db, out=db)
+        db *= 20.0
+        active = mag.max(axis=1) > 1e-4
+        return db[active], db, spec
+
+    def _process_frames(self, n: int) -> np.ndarray:
+        hop = self.hop_length
+        frames = self._frames[:n]
+        windows = np.lib.stride_tricks.sliding_window_view(self._buf[:self.latency + n * hop], self.n_fft)
+        active_db, db, spec = self._analyse(windows[::hop], n)
+        if not self._frozen:
+            self._update_profile(active_db)
+        std = np.sqrt(self._m2 / max(self._count, 1))
+        np.add(self._mean, self.n_std_thresh * std, out=self._thresh, casting="unsafe")
+
+        # Bins above the threshold pass, the rest are attenuated by prop_decrease
+        gate, mask, smooth = self._gate[:n], self._mask[:n], self._smooth[:n]
+        np.greater(db, self._thresh, out=gate)
+        np.copyto(mask, 1.0 - self.prop_decrease)
+        mask[gate] = 1.0
+        smooth[:] = mask
+        smooth[:, 1:-1] += mask[:, :-2]
+        smooth[:, 1:-1] += mask[:, 2:]
+        smooth[:, 1:-1] /= 3.0
+        spec *= smooth
+
+        frames[:] = np.fft.irfft(spec, n=self.n_fft, axis=1)
+        frames *= self.synthesis_window
+
+        # Overlap-add: frame i lands at i * hop in the accumulator
+        ola = self._ola
+        for r in range(self.n_fft // hop):
+            ola[r * hop:r * hop + n * hop].reshape(n, hop)[:] += frames[:, r * hop:(r + 1) * hop]
+        out = ola[:n * hop].copy()
+
+        carry = n * hop
+        ola[:self.latency] = ola[carry:carry + self.latency]
+        ola[self.latency:] = 0.0
+        remaining = self._buf_len - carry
+        self._buf[:remaining] = self._buf[carry:self._buf_len]
+        self._buf_len = remaining
+        return out
+
+
+# Maximum number of cached speaker/recording noise profiles (about 4 KB each)
+PROFILE_CACHE_SIZE = 256
+
+
+class NoiseProfileCache:
+    """LRU cache of noise profiles keyed by speaker id or recording fingerprint"""
+
+    def __init__(self, max_entries: int = PROFILE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[NoiseProfile]:
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is not None:
+                self._profiles.move_to_end(key)
+        metrics.incr("noise_profile_hits" if profile is not None else "noise_profile_misses")
+        return profile
+
+    def put(self, key: str, profile: NoiseProfile) -> None:
+        with self._lock:
+            self._profiles[key] = profile
+            self._profiles.move_to_end(key)
+            while len(self._profiles) > self.max_entries:
+                self._profiles.popitem(last=False)
+            metrics.set_gauge("noise_profile_entries", len(self._profiles))
+
+    def get_or_compute(self, key: str, compute: Callable[[], NoiseProfile]) -> NoiseProfile:
+        profile = self.get(key)
+        if profile is None:
+            profile = compute()
+            self.put(key, profile)
+        return profile
+
+
+noise_profiles = NoiseProfileCache()
+
+_local = threading.local()
+
+
+def _get_gate() -> SpectralGate:
+    gate = getattr(_local, "gate", None)
+    if gate is None:
+        gate = _local.gate = SpectralGate()
+    return gate
+
+
+def estimate_profile(samples: np.ndarray) -> NoiseProfile:
+    """Estimate a noise profile for a float clip"""
+    return _get_gate().estimate_profile(samples)
+
+
+def precompute_profile(key: str, samples: np.ndarray) -> NoiseProfile:
+    """Estimate and cache the noise profile for a speaker or recording"""
+    profile = estimate_profile(samples)
+    noise_profiles.put(key, profile)
+    return profile
+
+
+def reduce_noise(
+    samples: np.ndarray,
+    prop_decrease: float = 0.75,
+    profile: Optional[NoiseProfile] = None
+) -> np.ndarray:
+    """Gate a float clip with a per-thread SpectralGate whose buffers are reused
+
+    Without a cached profile, one is estimated from the whole clip first, so
+    its start is not gated against statistics learned from itself and the
+    result does not depend on block boundaries.
+    """
+    gate = _get_gate()
+    gate.prop_decrease = prop_decrease
+    if profile is None:
+        profile = gate.estimate_profile(samples)
+    gate.set_profile(profile)
+    return gate.reduce(samples)
@@ -0,0 +1,425 @@
+"""gTTS synthesis with concurrent chunk fetching over a pooled HTTP session"""
+import base64
+import os
+import re
+import struct
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import List, Optional, Tuple
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from gtts import gTTS
+from gtts.tts import gTTSError
+from gtts.utils import _translate_url
+
+import metrics
+from audio_buffer import AudioBuffer, decode_audio
+from text_segmentation import ENGINE_CHUNK_CHARS, segment_text
+from tts_engines import TTSEngine
+
+# Translate endpoint used by gTTS; override to point at a stand-in server
+GTTS_URL = os.environ.get(
+    "GTTS_URL", _translate_url(tld="com", path="_/TranslateWebserverUi/data/batchexecute")
+)
+
+# Maximum number of chunk requests in flight across all syntheses
+GTTS_MAX_CONCURRENCY = int(os.environ.get("GTTS_MAX_CONCURRENCY", "8"))
+
+# Per-chunk HTTP timeout (seconds)
+GTTS_TIMEOUT = float(os.environ.get("GTTS_TIMEOUT", "10"))
+
+# Chunk latency percentile after which a hedged duplicate request is sent
+# (0 disables hedging), and the earliest a hedge may fire (seconds)
+GTTS_HEDGE_PERCENTILE = float(os.environ.get("GTTS_HEDGE_PERCENTILE", "95"))
+GTTS_HEDGE_MIN_DELAY = float(os.environ.get("GTTS_HEDGE_MIN_DELAY", "0.05"))
+
+# Overall deadline per chunk (seconds) and retries allowed within it
+GTTS_CHUNK_DEADLINE = float(os.environ.get("GTTS_CHUNK_DEADLINE", "20"))
+GTTS_MAX_RETRIES = int(os.environ.get("GTTS_MAX_RETRIES", "2"))
+
+# Byte budget for decoded chunk audio shared across requests
+GTTS_CACHE_BYTES = int(os.environ.get("GTTS_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+_AUDIO_RE = re.compile(r'jQ1olc","\[\\"(.*)\\"]')
+
+# MPEG audio Layer III bitrates (kbps) by version (3: MPEG-1, otherwise MPEG-2/2.5)
+# and sample rates by version bits
+_MP3_BITRATES = {
+    3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def normalize_chunk(text: str) -> str:
+    """Cache key form of a chunk: whitespace collapsed and trimmed"""
+    return " ".join(text.split())
+
+
+class LatencyTracker:
+    """Rolling window of recent chunk latencies"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """q-th percentile, or None until enough samples have been seen"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            return float(np.percentile(self._samples, q))
+
+
+class Fragment:
+    """One gTTS chunk: the MP3 bytes as served and the decoded audio"""
+
+    __slots__ = ("mp3", "audio")
+
+    def __init__(self, mp3: bytes, audio: AudioBuffer):
+        self.mp3 = mp3
+        self.audio = audio
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.mp3) + self.audio.samples.nbytes
+
+
+class FragmentCache:
+    """Byte-bounded LRU of chunk fragments keyed by (language, chunk text)"""
+
+    def __init__(self, max_bytes: int = GTTS_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[Fragment]:
+        with self._lock:
+            fragment = self._entries.get(key)
+            if fragment is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            self._report()
+        return fragment
+
+    def put(self, key, fragment: Fragment) -> None:
+        nbytes = fragment.nbytes
+        if nbytes > self.max_bytes:
+            return
+        # Shared between requests, so guard against in-place edits downstream
+        fragment.audio.samples.flags.writeable = False
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old.nbytes
+            self._entries[key] = fragment
+            self.size += nbytes
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted.nbytes
+                metrics.incr("gtts_fragment_evictions")
+            self._report()
+
+    def _report(self) -> None:
+        lookups = self.hits + self.misses
+        metrics.set_gauge("gtts_fragment_hits", self.hits)
+        metrics.set_gauge("gtts_fragment_misses", self.misses)
+        metrics.set_gauge("gtts_fragment_hit_ratio", self.hits / lookups if lookups else 0.0)
+        metrics.set_gauge("gtts_fragment_bytes", self.size)
+        metrics.set_gauge("gtts_fragment_entries", len(self._entries))
+
+
+class GTTSEngine(TTSEngine):
+    """Fetches gTTS chunks concurrently and reassembles them in order
+
+    Text is split into sentence chunks by segment_text; each chunk is posted
+    to the translate endpoint through one keep-alive session shared by a bounded
+    thread pool, decoded from memory, and concatenated. Decoded chunks are
+    kept in a FragmentCache so overlapping texts only fetch new chunks, and
+    identical chunks already in flight are fetched once.
+
+    Each chunk fetch has a deadline and bounded retries; when a request
+    outlives the recent p95 chunk latency, a hedged duplicate is sent and
+    whichever response arrives first wins.
+    """
+
+    name = "gtts"
+
+    def __init__(
+        self,
+        url: str = GTTS_URL,
+        max_concurrency: int = GTTS_MAX_CONCURRENCY,
+        timeout: float = GTTS_TIMEOUT,
+        cache: Optional[FragmentCache] = None,
+        hedge_percentile: float = GTTS_HEDGE_PERCENTILE,
+        chunk_deadline: float = GTTS_CHUNK_DEADLINE,
+        max_retries: int = GTTS_MAX_RETRIES
+    ):
+        self.url = url
+        self.hedge_percentile = hedge_percentile
+        self.chunk_deadline = chunk_deadline
+        self.max_retries = max_retries
+        self.latency = LatencyTracker()
+        self.cache = cache if cache is not None else FragmentCache()
+        self.timeout = timeout
+        self.session = requests.Session()
+        # Room for one hedged duplicate per in-flight chunk
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2 * max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(gTTS.GOOGLE_TTS_HEADERS)
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="gtts")
+        self._requests = ThreadPoolExecutor(max_workers=2 * max_concurrency, thread_name_prefix="gtts-http")
+        self._packers = {}
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    def _packer(self, lang: str) -> gTTS:
+        # gTTS instance per language, used only for its RPC packaging
+        if lang not in self._packers:
+            self._packers[lang] = gTTS(text=lang, lang=lang, lang_check=False)
+        return self._packers[lang]
+
+    def tokenize(self, text: str, lang: str) -> List[str]:
+        """Split text into sentence chunks of at most gTTS's 100 characters
+
+        Unlike gTTS, short texts are split too, so sentences shared between
+        requests map to the same cached chunks.
+        """
+        return list(segment_text(text, lang, ENGINE_CHUNK_CHARS["gtts"]))
+
+    def fetch_chunk(self, text: str, lang: str) -> bytes:
+        """Fetch the MP3 bytes for a single chunk, with deadline, retries and hedging"""
+        deadline = time.monotonic() + self.chunk_deadline
+        error = None
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if attempt:
+                metrics.incr("gtts_chunk_retries")
+            try:
+                return self._hedged_fetch(text, lang, remaining)
+            except gTTSError as e:
+                error = e
+        metrics.incr("gtts_chunk_failures")
+        raise error or gTTSError("TTS chunk deadline exceeded")
+
+    def _hedged_fetch(self, text: str, lang: str, remaining: float) -> bytes:
+        # Latency is tracked as time to the first usable response, so requests
+        # rescued by a hedge do not inflate the percentile that triggers hedges
+        started = time.monotonic()
+        timeout = min(self.timeout, remaining)
+        primary = self._requests.submit(self._request, text, lang, timeout)
+        hedge_after = self.latency.percentile(self.hedge_percentile) if self.hedge_percentile else None
+        if hedge_after is None:
+            audio = self._first_result([primary], remaining)
+        else:
+            hedge_after = max(hedge_after, GTTS_HEDGE_MIN_DELAY)
+            done, _ = wait([primary], timeout=hedge_after)
+            if done and primary.exception() is None:
+                audio = primary.result()
+            elif done:
+                raise _chunk_error(primary.exception())
+            else:
+                metrics.incr("gtts_chunk_hedges")
+                hedge = self._requests.submit(self._request, text, lang, timeout)
+                audio = self._first_result([primary, hedge], remaining - hedge_after)
+
+        self.latency.record(time.monotonic() - started)
+        metrics.set_gauge("gtts_chunk_latency_p95", self.latency.percentile(95) or 0.0)
+        return audio
+
+    @staticmethod
+    def _first_result(futures: List[Future], timeout: float) -> bytes:
+        # First successful response wins; fail once all have failed or time is up
+        deadline = time.monotonic() + timeout
+        pending, error = set(futures), None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise _chunk_error(error)
+
+    def _request(self, text: str, lang: str, timeout: float) -> bytes:
+        body = self._packer(lang)._package_rpc(text)
+        try:
+            response = self.session.post(self.url, data=body, timeout=timeout)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            raise gTTSError(f"TTS request failed: {e}")
+
+        audio = b"".join(
+            base64.b64decode(match.group(1))
+            for line in response.text.splitlines() if "jQ1olc" in line
+            for match in [_AUDIO_RE.search(line)] if match
+        )
+        if not audio:
+            raise gTTSError("No audio stream in TTS response")
+        return audio
+
+    def synthesize_chunk(self, text: str, lang: str) -> Fragment:
+        """Fetch and decode a single chunk, bypassing the cache"""
+        mp3 = self.fetch_chunk(text, lang)
+        return Fragment(mp3, decode_audio(mp3))
+
+    def chunk_future(self, text: str, lang: str) -> Future:
+        """Future for a chunk's Fragment, served from the cache or a shared fetch"""
+        key = (lang, normalize_chunk(text))
+        fragment = self.cache.get(key)
+        if fragment is not None:
+            future = Future()
+            future.set_result(fragment)
+            return future
+
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            if future is None:
+                future = self.executor.submit(self._fetch_and_cache, key)
+                self._inflight[key] = future
+        return future
+
+    def _fetch_and_cache(self, key) -> Fragment:
+        lang, text = key
+        try:
+            fragment = self.synthesize_chunk(text, lang)
+            self.cache.put(key, fragment)
+            return fragment
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def fragments(self, text: str, lang: str, chunks: Optional[List[str]] = None) -> List[Fragment]:
+        """Fragments for every chunk of text, in order, fetching uncached ones concurrently"""
+        chunks = chunks if chunks is not None else self.tokenize(text, lang)
+        if not chunks:
+            raise gTTSError("No text to send to TTS API")
+        futures = [self.chunk_future(chunk, lang) for chunk in chunks]
+        return [future.result() for future in futures]
+
+    def synthesize(self, text: str, lang: str, chunks: Optional[List[str]] = None) -> AudioBuffer:
+        """Synthesize text as decoded audio"""
+        return concat_buffers([f.audio for f in self.fragments(text, lang, chunks)])
+
+    def synthesize_mp3(self, text: str, lang: str) -> Tuple[bytes, AudioBuffer]:
+        """Synthesize text as one MP3 stream of the chunks gTTS serves, and as PCM
+
+        Chunks are joined with join_mp3; the PCM is the joined stream decoded,
+        so it matches what a player of the MP3 hears, including the encoder
+        padding at each join.
+        """
+        fragments = self.fragments(text, lang)
+        if len(fragments) == 1:
+            return fragments[0].mp3, fragments[0].audio
+        mp3 = join_mp3([f.mp3 for f in fragments])
+        return mp3, decode_audio(mp3)
+
+
+def _chunk_error(error: Optional[BaseException]) -> gTTSError:
+    # fetch_chunk retries only gTTSError, so other failures are wrapped; None means time ran out
+    if isinstance(error, gTTSError):
+        return error
+    if error is None:
+        return gTTSError("TTS chunk deadline exceeded")
+    return gTTSError(f"TTS request failed: {error!r}")
+
+
+def _id3_length(data: bytes) -> int:
+    # Size of a leading ID3v2 tag (header, syncsafe size and optional footer)
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = 0
+    for byte in data[6:10]:
+        size = size << 7 | (byte & 0x7F)
+    return 10 + size + (10 if data[5] & 0x10 else 0)
+
+
+def _frame_length(data: bytes, pos: int) -> Optional[int]:
+    # Length of the Layer III frame starting at pos, or None if there is none
+    if pos + 4 > len(data) or data[pos] != 0xFF or data[pos + 1] & 0xE0 != 0xE0:
+        return None
+    version, layer = data[pos + 1] >> 3 & 3, data[pos + 1] >> 1 & 3
+    bitrate_index, rate_index, padding = data[pos + 2] >> 4, data[pos + 2] >> 2 & 3, data[pos + 2] >> 1 & 1
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    kbps = _MP3_BITRATES[3 if version == 3 else 2][bitrate_index]
+    return (144 if version == 3 else 72) * kbps * 1000 // _MP3_SAMPLE_RATES[version][rate_index] + padding
+
+
+def _info_frame(data: bytes) -> Tuple[int, int, int]:
+    # (start of audio, length of a leading Xing/Info frame or 0, tag offset in that frame)
+    start = _id3_length(data)
+    length = _frame_length(data, start)
+    if length is not None:
+        frame = data[start:start + length]
+        for tag in (b"Xing", b"Info"):
+            if tag in frame:
+                return start, length, frame.index(tag)
+    return start, 0, -1
+
+
+def join_mp3(chunks: List[bytes]) -> bytes:
+    """Concatenate MP3 files into one stream
+
+    Every file may start with a Xing/Info frame giving its own frame count;
+    decoders trust the first one and stop after the first file. The first
+    file's tag is rewritten for the whole stream (frames, bytes and seek
+    table) and the tags and ID3 headers of the others are dropped.
+    """
+    start, length, tag = _info_frame(chunks[0])
+    head = bytearray(chunks[0][start:start + length])
+    body = [chunks[0][start + length:]]
+    for data in chunks[1:]:
+        start, skip, _ = _info_frame(data)
+        body.append(data[start + skip:])
+    body = b"".join(body)
+    if not length:
+        return chunks[0][:start] + body
+
+    offsets, pos = [], 0
+    while pos < len(body):
+        frame = _frame_length(body, pos)
+        if frame is None:
+            break
+        offsets.append(pos)
+        pos += frame
+    total = len(head) + len(body)
+    flags = struct.unpack_from(">I", head, tag + 4)[0]
+    field = tag + 8
+    if flags & 1:
+        struct.pack_into(">I", head, field, len(offsets))
+        field += 4
+    if flags & 2:
+        struct.pack_into(">I", head, field, total)
+        field += 4
+    if flags & 4 and offsets:
+        # Byte position (1/256 of the stream) at each percent of the duration
+        head[field:field + 100] = bytes(
+            min(255, (len(head) + offsets[len(offsets) * i // 100]) * 256 // total) for i in range(100)
+        )
+    return chunks[0][:start] + bytes(head) + body
+
+
+def concat_buffers(buffers: List[AudioBuffer]) -> AudioBuffer:
+    """Join buffers that share a sample rate and channel count"""
+    if len(buffers) == 1:
+        return buffers[0]
+    return buffers[0].with_samples(np.concatenate([buf.samples for buf in buffers]))
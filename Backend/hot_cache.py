@@ -0,0 +1,82 @@
+"""Bounded in-memory tier for recently produced audio outputs
+
+New outputs are usually downloaded once or twice within seconds, so they
+are kept in memory (by bytes, least recently used first out) and served
+from there; evicted objects are simply read from disk again.
+"""
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import metrics
+from audio_serving import file_etag
+
+# Total bytes held in memory
+HOT_CACHE_BYTES = int(os.environ.get("HOT_CACHE_BYTES", str(128 * 1024 * 1024)))
+
+# Larger outputs (e.g. audiobooks) are only served from disk
+HOT_CACHE_MAX_ITEM_BYTES = int(os.environ.get("HOT_CACHE_MAX_ITEM_BYTES", str(8 * 1024 * 1024)))
+
+
+class HotEntry(NamedTuple):
+    data: memoryview
+    mtime: float
+    etag: str
+    stored: bool
+
+
+class HotAudioCache:
+    """Byte-bounded LRU of output files keyed by their path relative to root"""
+
+    def __init__(self, root: Path, max_bytes: int = HOT_CACHE_BYTES, max_item_bytes: int = HOT_CACHE_MAX_ITEM_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self._entries: "OrderedDict[str, HotEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, path: Path, data: Optional[bytes] = None) -> None:
+        """Hold a freshly written output; data is its content if the writer still has it"""
+        st = path.stat()
+        if st.st_size > self.max_item_bytes or st.st_size > self.max_bytes:
+            return
+        etag, stored = file_etag(path, st)
+        entry = HotEntry(memoryview(data if data is not None else path.read_bytes()), st.st_mtime, etag, stored)
+        name = path.relative_to(self.root).as_posix()
+        with self._lock:
+            self._remove(name)
+            self._entries[name] = entry
+            self._bytes += len(entry.data)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.data)
+                metrics.incr("hot_cache_evictions")
+            self._publish()
+
+    def get(self, name: str) -> Optional[HotEntry]:
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                metrics.incr("hot_cache_misses")
+                return None
+            self._entries.move_to_end(name)
+        metrics.incr("hot_cache_hits")
+        return entry
+
+    def discard(self, name: str) -> None:
+        """Forget an object, e.g. when its file is deleted"""
+        with self._lock:
+            self._remove(name)
+            self._publish()
+
+    def _remove(self, name: str) -> None:
+        entry = self._entries.pop(name, None)
+        if entry is not None:
+            self._bytes -= len(entry.data)
+
+    def _publish(self) -> None:
+        metrics.set_gauge("hot_cache_bytes", self._bytes)
+        metrics.set_gauge("hot_cache_items", len(self._entries))
@@ -0,0 +1,296 @@
+"""Long-form (audiobook) synthesis jobs with per-chunk checkpoints
+
+A job's text is segmented once and stored next to its state. Chunks are
+synthesized in parallel and each finished chunk is written to disk as 16-bit
+PCM, so a restarted server resumes with only the missing chunks. When every
+chunk exists, they are streamed into one WAV with short crossfades, keeping
+memory use independent of book length. A finished job keeps only its state,
+which is deleted once its output has been evicted from the output directory.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import numpy as np
+
+import metrics
+from audio_buffer import AudioBuffer
+from text_segmentation import segment_text
+
+# Characters accepted for one job (a 300-page book is roughly 600k characters)
+MAX_JOB_TEXT_LENGTH = int(os.environ.get("LONGFORM_MAX_CHARS", str(2_000_000)))
+
+# Chunks synthesized concurrently across all jobs
+LONGFORM_WORKERS = int(os.environ.get("LONGFORM_WORKERS", str(os.cpu_count() or 2)))
+
+# Crossfade between consecutive chunks (seconds)
+CROSSFADE_SECONDS = 0.015
+
+
+class Job:
+    """State of one long-form job, persisted as job.json in its directory"""
+
+    def __init__(self, directory: Path, state: dict):
+        self.directory = directory
+        self.state = state
+        self.chunks: List[str] = []
+        self.lock = threading.Lock()
+
+    @property
+    def id(self) -> str:
+        return self.state["id"]
+
+    def chunk_path(self, index: int) -> Path:
+        return self.directory / f"chunk_{index:06d}.pcm"
+
+    def save(self) -> None:
+        with self.lock:
+            _atomic_write(self.directory / "job.json", json.dumps(self.state).encode())
+
+    def progress(self) -> dict:
+        with self.lock:
+            state = dict(self.state)
+        total = state["total_chunks"]
+        state["progress"] = state["completed_chunks"] / total if total else 0.0
+        return state
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class JobManager:
+    """Creates, runs and resumes long-form jobs
+
+    render(job_state, text) must return the finished (effects applied) audio
+    for one chunk; it is called from worker threads. on_output, if given, is
+    called with the path of each finished output file. kind_workers caps the
+    chunks of a job kind rendered at once (its own pool), e.g. for a model
+    that serializes inference anyway.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        render: Callable[[dict, str], AudioBuffer],
+        output_dir: Path,
+        workers: int = LONGFORM_WORKERS,
+        on_output: Optional[Callable[[Path], None]] = None,
+        kind_workers: Optional[Dict[str, int]] = None
+    ):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.render = render
+        self.output_dir = output_dir
+        self.on_output = on_output
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="longform")
+        self.kind_executors = {
+            kind: ThreadPoolExecutor(max_workers=n, thread_name_prefix=f"longform-{kind}")
+            for kind, n in (kind_workers or {}).items()
+        }
+        self.jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def create(self, kind: str, text: str, language: str, chunk_chars: int, params: dict,
+               output: str, reference: Optional[bytes] = None) -> Job:
+        """Segment text, persist the job and start it
+
+        output is the file name relative to output_dir; if it already exists
+        (an identical earlier job) the job completes without synthesis.
+        """
+        job_id = uuid.uuid4().hex
+        directory = self.root / job_id
+        directory.mkdir()
+        chunks = list(segment_text.__wrapped__(text, language, chunk_chars, merge=True))
+        _atomic_write(directory / "chunks.json", json.dumps(chunks).encode())
+        if reference is not None:
+            _atomic_write(directory / "reference.wav", reference)
+
+        job = Job(directory, {
+            "id": job_id,
+            "kind": kind,
+            "language": language,
+            "params": params,
+            "status": "queued",
+            "total_chunks": len(chunks),
+            "completed_chunks": 0,
+            "sample_rate": None,
+            "channels": None,
+            "output": output,
+            "error": None,
+        })
+        job.chunks = chunks
+        job.save()
+        metrics.incr("longform_jobs_created")
+        self._start(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """A job by id; None once it is unknown or its output has expired"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+        if job is None and (self.root / job_id / "job.json").exists():
+            job = self._load(self.root / job_id)
+        if job is not None and self._output_expired(job):
+            self._delete(job)
+            return None
+        return job
+
+    def expire(self, max_age: float) -> List[str]:
+        """Delete finished jobs whose output is gone and failed jobs idle for max_age seconds"""
+        expired = []
+        for directory in sorted(self.root.iterdir()):
+            try:
+                job = self._load(directory)
+                idle = time.time() - (directory / "job.json").stat().st_mtime
+            except (OSError, ValueError):
+                continue
+            if self._output_expired(job) or (job.state["status"] == "failed" and idle > max_age):
+                self._delete(job)
+                expired.append(job.id)
+        if expired:
+            metrics.incr("longform_jobs_expired", len(expired))
+        return expired
+
+    def _output_expired(self, job: Job) -> bool:
+        return job.state["status"] == "done" and not (self.output_dir / job.state["output"]).exists()
+
+    def _delete(self, job: Job) -> None:
+        with self._lock:
+            self.jobs.pop(job.id, None)
+        shutil.rmtree(job.directory, ignore_errors=True)
+
+    def resume(self, job_id: str) -> Optional[Job]:
+        """Retry a failed job; chunks already checkpointed are not synthesized again"""
+        job = self.get(job_id)
+        if job is not None and job.state["status"] == "failed":
+            with job.lock:
+                job.state["status"] = "queued"
+                job.state["error"] = None
+            metrics.incr("longform_jobs_resumed")
+            self._start(job)
+        return job
+
+    def resume_all(self) -> None:
+        """Restart every job that had not finished when the server stopped"""
+        for directory in sorted(self.root.iterdir()):
+            if (directory / "job.json").exists():
+                job = self._load(directory)
+                if job.state["status"] not in ("done", "failed"):
+                    metrics.incr("longform_jobs_resumed")
+                    self._start(job)
+
+    def _load(self, directory: Path) -> Job:
+        job = Job(directory, json.loads((directory / "job.json").read_text()))
+        chunks = directory / "chunks.json"
+        # Finished jobs no longer keep their text
+        job.chunks = json.loads(chunks.read_text()) if chunks.exists() else []
+        return job
+
+    def _discard_inputs(self, job: Job) -> None:
+        # Text and reference are only needed until the output exists
+        for name in ("chunks.json", "reference.wav"):
+            (job.directory / name).unlink(missing_ok=True)
+
+    def _start(self, job: Job) -> None:
+        with self._lock:
+            self.jobs[job.id] = job
+        threading.Thread(target=self._run, args=(job,), daemon=True, name=f"job-{job.id[:8]}").start()
+
+    def _run(self, job: Job) -> None:
+        try:
+            if (self.output_dir / job.state["output"]).exists():
+                with job.lock:
+                    job.state["status"] = "done"
+                    job.state["completed_chunks"] = job.state["total_chunks"]
+                job.save()
+                self._discard_inputs(job)
+                metrics.incr("longform_jobs_deduplicated")
+                return
+
+            pending = [i for i in range(len(job.chunks)) if not job.chunk_path(i).exists()]
+            with job.lock:
+                job.state["status"] = "running"
+                job.state["completed_chunks"] = len(job.chunks) - len(pending)
+            job.save()
+
+            # Surface the first failure, but let already-submitted chunks checkpoint
+            executor = self.kind_executors.get(job.state["kind"], self.executor)
+            for future in [executor.submit(self._render_chunk, job, i) for i in pending]:
+                future.result()
+
+            with job.lock:
+                job.state["status"] = "assembling"
+            job.save()
+            self._assemble(job)
+            with job.lock:
+                job.state["status"] = "done"
+            self._discard_inputs(job)
+            metrics.incr("longform_jobs_completed")
+        except Exception as e:
+            logging.exception("Long-form job %s failed", job.id)
+            with job.lock:
+                job.state["status"] = "failed"
+                job.state["error"] = str(e)
+            metrics.incr("longform_jobs_failed")
+        job.save()
+
+    def _render_chunk(self, job: Job, index: int) -> None:
+        audio = self.render(job.state, job.chunks[index])
+        _atomic_write(job.chunk_path(index), audio.to_pcm16())
+        with job.lock:
+            if job.state["sample_rate"] is None:
+                job.state["sample_rate"] = audio.sample_rate
+                job.state["channels"] = audio.channels
+            elif (audio.sample_rate, audio.channels) != (job.state["sample_rate"], job.state["channels"]):
+                raise RuntimeError("Chunk audio format changed mid-job")
+            job.state["completed_chunks"] += 1
+        job.save()
+        metrics.incr("longform_chunks_rendered")
+
+    def _assemble(self, job: Job) -> None:
+        # Stream chunks into the WAV, crossfading each join; only one chunk is in memory
+        sr, channels = job.state["sample_rate"], job.state["channels"]
+        fade = int(sr * CROSSFADE_SECONDS)
+        ramp = np.linspace(0.0, 1.0, fade, dtype=np.float32)[:, None]
+        output = self.output_dir / job.state["output"]
+        output.parent.mkdir(parents=True, exist_ok=True)
+        tmp = output.with_name(output.name + ".tmp")
+
+        with wave.open(str(tmp), "wb") as wav:
+            wav.setnchannels(channels)
+            wav.setsampwidth(2)
+            wav.setframerate(sr)
+            tail = None
+            for index in range(len(job.chunks)):
+                audio = AudioBuffer.from_pcm16(job.chunk_path(index).read_bytes(), sr, channels)
+                samples = np.array(audio.samples)
+                if not len(samples):
+                    # Nothing to join; the pending tail fades into the next chunk instead
+                    continue
+                n = min(len(tail), len(samples)) if tail is not None else 0
+                if n > 0:
+                    samples[:n] = tail[-n:] * ramp[::-1][-n:] + samples[:n] * ramp[:n]
+                    if n < len(tail):
+                        wav.writeframes(audio.with_samples(tail[:-n]).to_pcm16())
+                keep = min(fade, len(samples))
+                wav.writeframes(audio.with_samples(samples[:len(samples) - keep]).to_pcm16())
+                tail = samples[len(samples) - keep:]
+            if tail is not None:
+                wav.writeframes(AudioBuffer(tail, sr).to_pcm16())
+        os.replace(tmp, output)
+        if self.on_output is not None:
+            self.on_output(output)
+
+        for index in range(len(job.chunks)):
+            job.chunk_path(index).unlink(missing_ok=True)
@@ -1,22 +1,47 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, WebSocket
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-from typing import Union, List, Optional
-from gtts import gTTS
-from pydub import AudioSegment, effects
-import noisereduce as nr
+from typing import List, Optional
+from collections import OrderedDict
+from pydub import AudioSegment
 import numpy as np
 from pathlib import Path
+import asyncio
+import io
+import json
 import os
 import uuid
+import zipfile
+import hashlib
 import shutil
 import tempfile
-import re
 import string
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from TTS.api import TTS
 
+import metrics
+from audio_buffer import AudioBuffer
+from wav_reader import is_mappable_wav
+from audio_janitor import AudioJanitor, TEMP_AUDIO_SWEEP_INTERVAL
+from audio_metadata import compute_metadata, load_metadata, save_metadata, sidecar, summarize_file
+from audio_serving import MUTABLE_CACHE_CONTROL, STORED_CACHE_CONTROL, file_etag, serve_bytes, serve_file
+from hot_cache import HotAudioCache
+from gtts_engine import GTTSEngine
+from longform import JobManager, MAX_JOB_TEXT_LENGTH
+from output_store import OutputStore
+from phrase_library import PHRASE_INDEX, PhraseIndex
+from output_formats import (
+    OUTPUT_FORMATS, encode_rendition, negotiate_format, resolve_encoding, transcode, transcoded_bytes
+)
+from speech_stream import SpeechStream
+from tts_engines import EngineRouter, LocalTTSEngine
+from text_segmentation import ENGINE_CHUNK_CHARS, SentenceStream, normalize_text, segment_text
+from voice_effects import EMOTION_PLANS, EMOTION_PRESETS, high_pass
+from denoise import decide_noise_reduction, reduce_noise, estimate_profile, noise_profiles, precompute_profile
+
 # Disable GPU
 os.environ["CUDA_VISIBLE_DEVICES"] = ""
 os.environ["TORCH_CPU_ONLY"] = "1"
@@ -34,18 +59,94 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Metadata of inline audio responses
+    expose_headers=["X-Text-Length", "X-Language", "X-Emotion", "X-Audio-Format", "X-File-Url"],
 )
 
 # Directory for audio files
 TEMP_DIR = Path("temp_audio")
 TEMP_DIR.mkdir(exist_ok=True)
 
-# Serve static audio files
-app.mount("/temp_audio", StaticFiles(directory=TEMP_DIR), name="temp_audio")
+# Recently produced outputs are served from memory; evicted ones come from disk again
+hot_cache = HotAudioCache(TEMP_DIR)
+
+# Deletes outputs past their TTL or over the disk quota, least recently used first
+janitor = AudioJanitor(TEMP_DIR, on_evict=hot_cache.discard)
+
+def register_output(path: Path, data: Optional[bytes] = None) -> None:
+    """Track a newly written output on disk and keep it hot in memory (data: its content, if at hand)"""
+    janitor.add(path)
+    hot_cache.add(path, data)
+
+# Outputs are stored under a digest of their request, so repeats reuse the existing file
+output_store = OutputStore(TEMP_DIR, on_publish=register_output)
+
+# Fixed app phrases pre-rendered offline (python -m phrase_library); kept on disk for good
+phrase_index = PhraseIndex.load(PHRASE_INDEX, root=TEMP_DIR)
+janitor.pin(name for output in phrase_index.names() for name in (output, sidecar(Path(output)).as_posix()))
+
+def find_output(digest: str, exts: tuple) -> Optional[str]:
+    """Stored output of a request digest, checking the in-memory phrase index first"""
+    return phrase_index.lookup(digest, exts) or output_store.find(digest, exts)
+
+def store_metadata(name: str, metadata: dict) -> dict:
+    """Save the duration/waveform/loudness sidecar of a stored output"""
+    janitor.add(save_metadata(TEMP_DIR / name, metadata))
+    return metadata
+
+def publish_output(digest: str, audio: AudioBuffer, mp3: Optional[bytes] = None) -> str:
+    """Store a final PCM buffer as WAV (or the engine's MP3 of it), summarized while it is in memory"""
+    if mp3 is not None:
+        name = output_store.publish_bytes(digest, "mp3", mp3)
+    else:
+        wav = io.BytesIO()
+        audio.to_segment().export(wav, format="wav")
+        name = output_store.publish_bytes(digest, "wav", wav.getvalue())
+    store_metadata(name, compute_metadata(audio))
+    return name
+
+def output_metadata(name: str) -> dict:
+    """Sidecar of a stored output, summarizing the file once if it has none (e.g. renditions)"""
+    metadata = load_metadata(TEMP_DIR / name)
+    if metadata is None:
+        metadata = store_metadata(name, summarize_file(TEMP_DIR / name))
+    return metadata
+
+def metadata_fields(name: str, metadata: dict, base_url: str) -> dict:
+    """Summary fields of JSON responses; the waveform arrays are at metadata_url"""
+    return {
+        "duration": metadata["duration"],
+        "loudness_lufs": metadata["loudness_lufs"],
+        "metadata_url": f"{base_url}metadata/{name}",
+    }
+
+# Shared gTTS engine (pooled HTTP session, bounded chunk fan-out) and the
+# per-language engine router used by /generate
+gtts_engine = GTTSEngine()
+tts_router = EngineRouter([gtts_engine, LocalTTSEngine()])
+
+# Long-form job state and chunk checkpoints (kept out of the served directory)
+JOBS_DIR = Path(os.environ.get("LONGFORM_JOBS_DIR", "longform_jobs"))
+
+# Registered reference voices, used by /stream
+SPEAKERS_DIR = Path(os.environ.get("SPEAKERS_DIR", "speakers"))
+SPEAKERS_DIR.mkdir(exist_ok=True)
 
 # Constants
+XTTS_MODEL = "tts_models/multilingual/multi-dataset/xtts_v2"
+XTTS_SPEAKER_CACHE_SIZE = int(os.environ.get("XTTS_SPEAKER_CACHE_SIZE", "32"))
 MAX_TEXT_LENGTH = 5000
-EMOTIONS = ["Happy", "Sad", "Angry", "Surprise", "Fear", "Disgust", "Neutral"]
+MAX_BATCH_ITEMS = 100
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "4"))
+EMOTIONS = list(EMOTION_PRESETS)
+
+# Worker pool for synthesis and encoding of /generate and batch items
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix="batch")
+
+# /clone and reference preparation run apart from batch work: requests queued
+# on the (serialized) XTTS model must not hold up gTTS synthesis
+CLONE_CONCURRENCY = int(os.environ.get("CLONE_CONCURRENCY", "2"))
+clone_executor = ThreadPoolExecutor(max_workers=CLONE_CONCURRENCY, thread_name_prefix="clone")
 
 # Supported languages for gTTS (Standard TTS)
 STANDARD_LANGUAGES = {
@@ -114,58 +215,150 @@ CLONE_LANGUAGES = {
 
 def preprocess_text(text: str) -> str:
     """Clean and normalize text for TTS with better Unicode handling"""
-    # Remove extra whitespace
-    text = ' '.join(text.split())
-    # Remove control characters but preserve Unicode letters and common punctuation
-    text = re.sub(r'[\x00-\x1F\x7F-\x9F]', '', text)
-    return text
-
-def normalize_audio(audio: AudioSegment) -> AudioSegment:
-    """Normalize audio volume and reduce noise"""
+    return normalize_text(text)
+
+# Running estimate of spectral gating cost (seconds of CPU per second of audio),
+# used to report the time saved when spectral gating is skipped
+_denoise_cost_per_second = 0.05
+
+# Peak level targeted by loudness normalization (same headroom as pydub's normalize)
+NORMALIZE_HEADROOM_DB = 0.1
+
+def recording_fingerprint(buf: AudioBuffer) -> str:
+    """Stable key for a reference recording, used to cache its noise profile"""
+    return hashlib.sha1(buf.samples).hexdigest()
+
+def normalize_peak(buf: AudioBuffer) -> AudioBuffer:
+    """Scale so the peak sits NORMALIZE_HEADROOM_DB below full scale"""
+    peak = float(np.max(np.abs(buf.samples))) if len(buf) else 0.0
+    if peak == 0.0:
+        return buf
+    return buf.with_samples(buf.samples * np.float32(10.0 ** (-NORMALIZE_HEADROOM_DB / 20.0) / peak))
+
+def normalize_audio(buf: AudioBuffer, profile_key: Optional[str] = None) -> AudioBuffer:
+    """Normalize audio volume and reduce noise when the clip needs it
+
+    When profile_key is given, the noise profile is estimated once for that
+    speaker/recording and reused from the cache on later calls.
+    """
+    global _denoise_cost_per_second
     try:
         # Normalize loudness
-        audio = effects.normalize(audio)
-
-        # Convert to numpy array for noise reduction
-        samples = np.array(audio.get_array_of_samples())
-        reduced_noise = nr.reduce_noise(
-            y=samples,
-            sr=audio.frame_rate,
-            stationary=True,
-            prop_decrease=0.75
-        )
-        
-        # Convert back to AudioSegment
-        return AudioSegment(
-            reduced_noise.tobytes(),
-            frame_rate=audio.frame_rate,
-            sample_width=audio.sample_width,
-            channels=audio.channels
-        )
+        buf = normalize_peak(buf)
+
+        # Cheap noise-floor estimate decides whether the STFT round trip is worth it
+        decision = decide_noise_reduction(buf.samples.reshape(-1), buf.sample_rate * buf.channels)
+        metrics.incr(f"denoise_decision_{decision.strength}")
+        metrics.set_gauge("denoise_last_snr_db", decision.snr_db)
+
+        if decision.strength == "skip":
+            metrics.incr("denoise_seconds_saved", _denoise_cost_per_second * buf.duration)
+            return buf
+
+        # Streaming spectral gate, one channel at a time
+        started = time.perf_counter()
+        profile = None
+        if profile_key:
+            profile = noise_profiles.get_or_compute(profile_key, lambda: estimate_profile(buf.mono()))
+        reduced = np.empty_like(buf.samples)
+        for ch in range(buf.channels):
+            reduced[:, ch] = reduce_noise(buf.samples[:, ch], decision.prop_decrease, profile)
+        if buf.duration > 0:
+            cost = (time.perf_counter() - started) / buf.duration
+            _denoise_cost_per_second = 0.9 * _denoise_cost_per_second + 0.1 * cost
+
+        return buf.with_samples(reduced)
     except Exception as e:
         print(f"Audio normalization error: {e}")
-        return audio  # Return original if processing fails
-
-def adjust_emotion(audio: AudioSegment, emotion: str) -> AudioSegment:
-    """Adjust audio parameters based on emotion"""
-    if emotion == "Happy":
-        return audio.speedup(playback_speed=1.1).apply_gain(3)
-    elif emotion == "Sad":
-        return audio.speedup(playback_speed=0.9).apply_gain(-3)
-    elif emotion == "Angry":
-        return audio.speedup(playback_speed=1.2).apply_gain(5)
-    elif emotion == "Surprise":
-        return audio.speedup(playback_speed=1.3).apply_gain(8)
-    elif emotion == "Fear":
-        return audio.speedup(playback_speed=1.4).apply_gain(-5)
-    elif emotion == "Disgust":
-        return audio.speedup(playback_speed=0.8).apply_gain(-2)
-    else:  # Neutral or unknown
-        return audio
+        return buf  # Return original if processing fails
+
+def apply_voice_effects(
+    buf: AudioBuffer,
+    emotion: Optional[str],
+    speed: float,
+    breath_effect: float,
+    intonation: float,
+    articulation: float,
+    normalize: bool = False
+) -> AudioBuffer:
+    """Apply user controls merged with the emotion's precompiled effect plan"""
+    plan = EMOTION_PLANS[emotion or "Neutral"]
+    gain = (breath_effect - 0.5) * 10  # Convert 0-1 scale to -5 to +5 dB
+    shift = (intonation - 0.5) * 10  # Convert 0-1 scale to -5 to +5 semitones
+
+    # Pitch shift and tempo change, user and emotion values combined
+    buf = plan.apply_tempo_pitch(buf, speed=speed, pitch_semitones=shift)
+
+    # Apply articulation (equalization)
+    if articulation != 0.5:
+        # Simple EQ adjustment - boost highs for better articulation
+        buf = high_pass(buf, 1000 * articulation)
+    buf = plan.apply_eq(buf)
+
+    if normalize:
+        buf = normalize_audio(buf)
+
+    # Breath effect (volume) and emotion gain in one step
+    return plan.apply_gain(buf, gain_db=gain)
+
+def effects_are_neutral(
+    emotion: Optional[str],
+    speed: float,
+    breath_effect: float,
+    intonation: float,
+    articulation: float
+) -> bool:
+    """True when no effect would change the synthesized audio"""
+    return (
+        (emotion or "Neutral") == "Neutral"
+        and speed == 1.0
+        and breath_effect == 0.5
+        and intonation == 0.5
+        and articulation == 0.5
+    )
+
+# XTTS is loaded once and shared; inference is serialized because the model is not thread-safe.
+# Speaker conditioning latents are cached (LRU) by a digest of the reference recording, so a
+# known voice skips re-encoding it and a new recording under a reused speaker_id never hits old ones
+_xtts = None
+_xtts_lock = threading.Lock()
+_xtts_speakers = OrderedDict()
+
+def reference_digest(voice_path: str) -> str:
+    """Digest of a prepared reference recording"""
+    return hashlib.sha256(Path(voice_path).read_bytes()).hexdigest()
+
+def xtts_synthesize(text: str, language: str, speaker_wav: str, reference: Optional[str] = None) -> AudioBuffer:
+    """Clone speaker_wav's voice for one chunk of text
+
+    reference is speaker_wav's reference_digest, when the caller already has it.
+    """
+    global _xtts
+    key = reference or reference_digest(speaker_wav)
+    with _xtts_lock:
+        if _xtts is None:
+            _xtts = TTS(model_name=XTTS_MODEL, progress_bar=False, gpu=False)
+        model = _xtts.synthesizer.tts_model
+        latents = _xtts_speakers.get(key)
+        if latents is None:
+            metrics.incr("xtts_speaker_cache_misses")
+            latents = model.get_conditioning_latents(audio_path=[speaker_wav])
+            _xtts_speakers[key] = latents
+            if len(_xtts_speakers) > XTTS_SPEAKER_CACHE_SIZE:
+                _xtts_speakers.popitem(last=False)
+        else:
+            metrics.incr("xtts_speaker_cache_hits")
+            _xtts_speakers.move_to_end(key)
+        gpt_cond_latent, speaker_embedding = latents
+        samples = model.inference(text, language, gpt_cond_latent, speaker_embedding)["wav"]
+        return AudioBuffer(np.asarray(samples, dtype=np.float32), _xtts.synthesizer.output_sample_rate)
 
 def convert_to_wav(input_path: str, output_path: str) -> bool:
-    """Convert any audio file to WAV format using pydub"""
+    """Convert any audio file to WAV format using pydub (readable WAV uploads are copied as-is)"""
     try:
+        if is_mappable_wav(input_path):
+            shutil.copyfile(input_path, output_path)
+            return True
         audio = AudioSegment.from_file(input_path)
         audio.export(output_path, format="wav")
         return True
@@ -173,6 +366,255 @@ def convert_to_wav(input_path: str, output_path: str) -> bool:
         print(f"Audio conversion error: {e}")
         return False
 
+def prepare_reference(voice_file: UploadFile, temp_dir: str, speaker_id: Optional[str]) -> tuple:
+    """Save an uploaded voice sample as a normalized WAV in temp_dir
+
+    Returns the WAV path and the speaker key (speaker_id, or a fingerprint
+    of the recording) used for the noise-profile cache.
+    """
+    # Save uploaded file (keep original extension)
+    temp_input_path = os.path.join(temp_dir, f"voice_{uuid.uuid4()}{Path(voice_file.filename).suffix}")
+    with open(temp_input_path, "wb") as f:
+        shutil.copyfileobj(voice_file.file, f)
+
+    # Convert to WAV if needed
+    voice_path = os.path.join(temp_dir, f"voice_{uuid.uuid4()}.wav")
+    if not convert_to_wav(temp_input_path, voice_path):
+        raise HTTPException(status_code=400, detail="Unsupported audio format")
+
+    # Preprocess the input voice file
+    input_audio = AudioBuffer.from_wav(voice_path)
+    key = speaker_id or recording_fingerprint(input_audio)
+    input_audio = normalize_audio(input_audio, profile_key=key)
+    input_audio.to_segment().export(voice_path, format="wav")
+    return voice_path, key
+
+def speaker_path(speaker_id: str) -> Path:
+    """Stored reference WAV of a registered speaker (ids are hashed into safe file names)"""
+    return SPEAKERS_DIR / f"{hashlib.sha1(speaker_id.encode()).hexdigest()}.wav"
+
+def validate_generate(text: str, language: str, emotion: Optional[str]) -> None:
+    """Reject /generate parameters the pipeline cannot handle"""
+    if len(text.strip()) > MAX_TEXT_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Text too long (max {MAX_TEXT_LENGTH} chars)")
+
+    if language not in STANDARD_LANGUAGES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported language. Supported: {', '.join(STANDARD_LANGUAGES.keys())}"
+        )
+
+    if emotion and emotion not in EMOTIONS:
+        raise HTTPException(status_code=400, detail=f"Invalid emotion. Choose from: {', '.join(EMOTIONS)}")
+
+def synthesize_generated(
+    text: str,
+    language: str,
+    emotion: Optional[str],
+    speed: float,
+    breath_effect: float,
+    intonation: float,
+    articulation: float,
+    mp3: bool = False
+) -> tuple:
+    """(processed PCM, engine MP3 or None, name of the engine used)
+
+    With mp3 set, no effect to apply and an engine that produces MP3, its
+    stream is returned for serving as-is, with the PCM it decodes to.
+    """
+    neutral = effects_are_neutral(emotion, speed, breath_effect, intonation, articulation)
+    # Fast path: MP3 requested with neutral effects, serve the engine's MP3 untouched
+    if mp3 and neutral:
+        result = tts_router.synthesize_mp3(text, language)
+        if result is not None:
+            metrics.incr("generate_fast_path")
+            return result[1], result[0], tts_router.primary(language)
+
+    # Synthesize with the configured engine for this language (gTTS or local)
+    audio, engine = tts_router.synthesize_with_engine(text, language)
+    if neutral:
+        # Engine output is clean speech: loudness only, no noise estimate or gating
+        return normalize_peak(audio), None, engine
+    return apply_voice_effects(
+        audio, emotion, speed, breath_effect, intonation, articulation, normalize=True
+    ), None, engine
+
+def generate_digest(*params, engine: Optional[str] = None) -> str:
+    """Output store key of a /generate request (text, language, emotion, effect values and engine)
+
+    engine defaults to the language's primary engine, whose outputs requests look up.
+    """
+    text, language, emotion, *effects = params
+    engine = engine or tts_router.primary(language)
+    return output_store.request_key("generate", engine, text, language, emotion or "Neutral", *effects)
+
+def render_generated(
+    text: str,
+    language: str,
+    emotion: Optional[str],
+    speed: float,
+    breath_effect: float,
+    intonation: float,
+    articulation: float,
+    mp3: bool = False
+) -> str:
+    """Synthesize and post-process text into the output store and return its path there
+
+    An identical earlier request is answered with its existing file. The
+    engine's MP3 is stored (and reused) only for mp3, since it is served
+    as-is; every other format is made from a WAV source.
+    """
+    params = (text, language, emotion, speed, breath_effect, intonation, articulation)
+    digest = generate_digest(*params)
+    existing = find_output(digest, ("mp3", "wav") if mp3 else ("wav",))
+    if existing is not None:
+        return existing
+
+    audio, engine_mp3, engine = synthesize_generated(*params, mp3)
+    if engine != tts_router.primary(language):
+        # A fallback engine's voice is stored apart, so it never answers later requests
+        metrics.incr("generate_fallback_outputs")
+        digest = generate_digest(*params, engine=engine)
+    return publish_output(digest, audio, engine_mp3)
+
+def clone_digest(voice_path: str, text: str, language: str, emotion: Optional[str], *effects) -> str:
+    """Output store key of a /clone request (prepared reference, text, language, emotion, effects)"""
+    return output_store.request_key("clone", reference_digest(voice_path), text, language, emotion or "Neutral", *effects)
+
+def synthesize_cloned(
+    voice_path: str,
+    text: str,
+    language: str,
+    emotion: Optional[str],
+    speed: float,
+    breath_effect: float,
+    intonation: float,
+    articulation: float
+) -> AudioBuffer:
+    """Clone the reference voice one sentence chunk at a time, then post-process"""
+    segments = segment_text(text, language, ENGINE_CHUNK_CHARS["xtts"], merge=True)
+    reference = reference_digest(voice_path)
+    chunks = [xtts_synthesize(segment, language, voice_path, reference) for segment in segments]
+    audio = chunks[0].with_samples(np.concatenate([chunk.samples for chunk in chunks]))
+    return apply_voice_effects(audio, emotion, speed, breath_effect, intonation, articulation)
+
+def render_phrase(text: str, language: str, emotion: Optional[str], speaker_id: Optional[str]) -> tuple:
+    """(digest, store path) of a phrase library variant, rendered as /generate or /clone would
+
+    Effects are the endpoint defaults, so default-setting requests match the library.
+    """
+    text = preprocess_text(text)
+    effects = (1.0, 0.5, 0.5, 0.5)
+    if speaker_id is None:
+        validate_generate(text, language, emotion)
+        name = render_generated(text, language, emotion, *effects)
+        return Path(name).stem, name
+
+    if language not in CLONE_LANGUAGES:
+        raise ValueError(f"Unsupported language for cloning: {language}")
+    voice_path = str(speaker_path(speaker_id))
+    if not os.path.exists(voice_path):
+        raise ValueError(f"Unknown speaker: {speaker_id}")
+    digest = clone_digest(voice_path, text, language, emotion, *effects)
+    name = output_store.find(digest, ("wav",))
+    if name is None:
+        name = publish_output(digest, synthesize_cloned(voice_path, text, language, emotion, *effects))
+    return digest, name
+
+def select_format(
+    output_format: Optional[str],
+    bitrate: Optional[int],
+    sample_rate: Optional[int],
+    accept: Optional[str]
+) -> tuple:
+    """(format, bitrate in bits/s, sample rate) from explicit parameters or the Accept header"""
+    try:
+        fmt = negotiate_format(output_format, accept)
+        return (fmt, *resolve_encoding(fmt, bitrate, sample_rate))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def mp3_passthrough(fmt: str, bitrate: Optional[int], sample_rate: Optional[int]) -> bool:
+    """Whether an engine MP3 can be served unchanged for the requested encoding"""
+    return fmt == "mp3" and bitrate is None and sample_rate is None
+
+def render_output(
+    text: str,
+    language: str,
+    emotion: Optional[str],
+    speed: float,
+    breath_effect: float,
+    intonation: float,
+    articulation: float,
+    fmt: str = "wav",
+    bitrate: Optional[int] = None,
+    sample_rate: Optional[int] = None
+) -> str:
+    """render_generated, then the stored rendition in the requested format"""
+    filename = render_generated(
+        text, language, emotion, speed, breath_effect, intonation, articulation,
+        mp3_passthrough(fmt, bitrate, sample_rate)
+    )
+    return transcode(output_store, filename, fmt, bitrate, sample_rate)
+
+def render_inline(
+    text: str,
+    language: str,
+    emotion: Optional[str],
+    speed: float,
+    breath_effect: float,
+    intonation: float,
+    articulation: float,
+    fmt: str,
+    bitrate: Optional[int],
+    sample_rate: Optional[int],
+    persist: bool
+) -> tuple:
+    """(audio bytes in the requested format, store path or None)
+
+    Nothing is written unless persist is set; a stored identical output is
+    still reused instead of synthesizing again.
+    """
+    params = (text, language, emotion, speed, breath_effect, intonation, articulation)
+    if persist:
+        name = render_output(*params, fmt, bitrate, sample_rate)
+        return (TEMP_DIR / name).read_bytes(), name
+
+    passthrough = mp3_passthrough(fmt, bitrate, sample_rate)
+    existing = find_output(generate_digest(*params), ("mp3", "wav") if passthrough else ("wav",))
+    if existing is not None:
+        return transcoded_bytes(output_store, existing, fmt, bitrate, sample_rate), None
+
+    audio, mp3, _ = synthesize_generated(*params, passthrough)
+    if mp3 is not None:
+        return mp3, None
+    return encode_rendition(audio, fmt, bitrate, sample_rate), None
+
+def audio_response(data: bytes, fmt: str, text: str, language: str, emotion: Optional[str],
+                   file_url: Optional[str] = None) -> Response:
+    """Audio bytes as the response body, request metadata in headers"""
+    headers = {
+        "Content-Disposition": f'inline; filename="speech.{OUTPUT_FORMATS[fmt].ext}"',
+        "X-Text-Length": str(len(text)),
+        "X-Language": language,
+        "X-Emotion": emotion or "Neutral",
+        "X-Audio-Format": fmt,
+    }
+    if file_url:
+        headers["X-File-Url"] = file_url
+    return Response(content=data, media_type=OUTPUT_FORMATS[fmt].media_type, headers=headers)
+
+def validate_response_mode(response_mode: str) -> None:
+    if response_mode not in ("url", "inline"):
+        raise HTTPException(status_code=400, detail="response_mode must be 'url' or 'inline'")
+
+def public_base_url(request: Request) -> str:
+    """Base URL for file links; Android emulators reach the host as 10.0.2.2"""
+    base_url = str(request.base_url)
+    if "localhost" in base_url or "127.0.0.1" in base_url:
+        base_url = base_url.replace("localhost", "10.0.2.2").replace("127.0.0.1", "10.0.2.2")
+    return base_url
+
 @app.get("/")
 async def root():
     return JSONResponse(content={"message": "Enhanced Voice API running", "docs": "/docs"})
@@ -186,81 +628,217 @@ async def generate_voice(
     breath_effect: float = Form(0.5),
     intonation: float = Form(0.5),
     articulation: float = Form(0.5),
+    output_format: str = Form(None),
+    bitrate: int = Form(None),
+    sample_rate: int = Form(None),
+    response_mode: str = Form("url"),
+    persist: bool = Form(False),
     request: Request = None
 ):
-    """Generate speech from text using gTTS with emotion support"""
-    text = preprocess_text(text)
-
-    if len(text.strip()) > MAX_TEXT_LENGTH:
-        raise HTTPException(status_code=400, detail=f"Text too long (max {MAX_TEXT_LENGTH} chars)")
+    """Generate speech from text using gTTS with emotion support
 
-    if language not in STANDARD_LANGUAGES:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Unsupported language. Supported: {', '.join(STANDARD_LANGUAGES.keys())}"
-        )
-
-    if emotion and emotion not in EMOTIONS:
-        raise HTTPException(status_code=400, detail=f"Invalid emotion. Choose from: {', '.join(EMOTIONS)}")
-
-    filename = f"generated_{uuid.uuid4()}.wav"
-    filepath = TEMP_DIR / filename
+    The audio format comes from output_format (wav, opus, mp3, aac) or else
+    the Accept header; bitrate is in kbps. With response_mode=inline the
+    audio is the response body (metadata in X- headers) and is only stored
+    when persist is set.
+    """
+    text = preprocess_text(text)
+    validate_generate(text, language, emotion)
+    validate_response_mode(response_mode)
+    encoding = select_format(output_format, bitrate, sample_rate, request.headers.get("accept"))
+    params = (text, language, emotion, speed, breath_effect, intonation, articulation, *encoding)
 
     try:
-        # Generate MP3 using gTTS with explicit UTF-8 handling
-        tts = gTTS(text=text, lang=language, lang_check=False)
-        mp3_path = filepath.with_suffix(".mp3")
-        tts.save(mp3_path)
-
-        # Convert MP3 to WAV and process
-        audio = AudioSegment.from_mp3(mp3_path)
-        
-        # Apply speed adjustment
-        if speed != 1.0:
-            audio = audio.speedup(playback_speed=speed)
-        
-        # Apply breath effect (volume adjustment)
-        if breath_effect != 0.5:
-            gain = (breath_effect - 0.5) * 10  # Convert 0-1 scale to -5 to +5 dB
-            audio = audio.apply_gain(gain)
-            
-        # Apply intonation (pitch shift)
-        if intonation != 0.5:
-            shift = (intonation - 0.5) * 10  # Convert 0-1 scale to -5 to +5 semitones
-            audio = audio._spawn(audio.raw_data, overrides={
-                "frame_rate": int(audio.frame_rate * (2.0 ** (shift / 12.0)))
-            }).set_frame_rate(audio.frame_rate)
-            
-        # Apply articulation (equalization)
-        if articulation != 0.5:
-            # Simple EQ adjustment - boost highs for better articulation
-            audio = audio.high_pass_filter(1000 * articulation)
-        
-        audio = normalize_audio(audio)
-        
-        if emotion:
-            audio = adjust_emotion(audio, emotion)
-        
-        audio.export(filepath, format="wav")
-        os.remove(mp3_path)  # Cleanup mp3
+        loop = asyncio.get_running_loop()
+        if response_mode == "inline":
+            data, filename = await loop.run_in_executor(batch_executor, render_inline, *params, persist)
+        else:
+            filename = await loop.run_in_executor(batch_executor, render_output, *params)
+            metadata = await loop.run_in_executor(batch_executor, output_metadata, filename)
     except Exception as e:
         raise HTTPException(
             status_code=500, 
             detail=f"Voice generation failed. This might be due to unsupported characters in the text or language limitations. Error: {str(e)}"
         )
 
-    # For Android localhost, use 10.0.2.2 instead of localhost
-    base_url = str(request.base_url)
-    if "localhost" in base_url or "127.0.0.1" in base_url:
-        base_url = base_url.replace("localhost", "10.0.2.2").replace("127.0.0.1", "10.0.2.2")
+    if response_mode == "inline":
+        file_url = f"{public_base_url(request)}temp_audio/{filename}" if filename else None
+        return audio_response(data, encoding[0], text, language, emotion, file_url)
 
     return JSONResponse(content={
-        "file_url": f"{base_url}temp_audio/{filename}",
+        "file_url": f"{public_base_url(request)}temp_audio/{filename}",
         "text_length": len(text),
         "language": language,
-        "emotion": emotion or "Neutral"
+        "emotion": emotion or "Neutral",
+        "format": encoding[0],
+        **metadata_fields(filename, metadata, public_base_url(request))
     })
 
+class BatchItem(BaseModel):
+    """One text in a batch; unset parameters fall back to the batch defaults"""
+    text: str
+    language: Optional[str] = None
+    emotion: Optional[str] = None
+    speed: Optional[float] = None
+    breath_effect: Optional[float] = None
+    intonation: Optional[float] = None
+    articulation: Optional[float] = None
+    output_format: Optional[str] = None
+    bitrate: Optional[int] = None
+    sample_rate: Optional[int] = None
+
+class BatchDefaults(BaseModel):
+    language: str = "en"
+    emotion: Optional[str] = None
+    speed: float = 1.0
+    breath_effect: float = 0.5
+    intonation: float = 0.5
+    articulation: float = 0.5
+    output_format: Optional[str] = None
+    bitrate: Optional[int] = None
+    sample_rate: Optional[int] = None
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+    defaults: BatchDefaults = BatchDefaults()
+    output: str = "manifest"  # "manifest" (NDJSON of file URLs) or "zip"
+
+class _ZipSink(io.RawIOBase):
+    """Unseekable sink that lets zipfile stream an archive out in pieces"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+@app.post("/generate_batch")
+async def generate_batch(batch: BatchRequest, request: Request):
+    """Generate many short texts in one request
+
+    Identical items are synthesized once. Results stream back as they
+    complete: one JSON line per item (manifest) or a ZIP archive (zip).
+    """
+    if not batch.items:
+        raise HTTPException(status_code=400, detail="No items to generate")
+    if len(batch.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Too many items (max {MAX_BATCH_ITEMS})")
+    if batch.output not in ("manifest", "zip"):
+        raise HTTPException(status_code=400, detail="output must be 'manifest' or 'zip'")
+
+    # Resolve per-item parameters, validate, and group identical items
+    defaults = batch.defaults.model_dump()
+    jobs = {}
+    for index, item in enumerate(batch.items):
+        params = {k: v for k, v in item.model_dump().items() if v is not None and k != "text"}
+        params = {**defaults, **params}
+        text = preprocess_text(item.text)
+        validate_generate(text, params["language"], params["emotion"])
+        encoding = select_format(
+            params["output_format"], params["bitrate"], params["sample_rate"], request.headers.get("accept")
+        )
+        key = (text, params["language"], params["emotion"], params["speed"],
+               params["breath_effect"], params["intonation"], params["articulation"], *encoding)
+        jobs.setdefault(key, []).append(index)
+    metrics.incr("batch_items", len(batch.items))
+    metrics.incr("batch_items_deduplicated", len(batch.items) - len(jobs))
+
+    base_url = public_base_url(request)
+    loop = asyncio.get_running_loop()
+
+    async def completed():
+        pending = {loop.run_in_executor(batch_executor, render_output, *key): key for key in jobs}
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                key = pending.pop(future)
+                yield key, future
+
+    async def manifest():
+        async for key, future in completed():
+            for index in jobs[key]:
+                if future.exception() is not None:
+                    entry = {"index": index, "error": str(future.exception())}
+                else:
+                    entry = {
+                        "index": index,
+                        "file_url": f"{base_url}temp_audio/{future.result()}",
+                        "metadata_url": f"{base_url}metadata/{future.result()}",
+                        "text_length": len(key[0]),
+                        "language": key[1],
+                        "emotion": key[2] or "Neutral",
+                        "format": key[7]
+                    }
+                yield json.dumps(entry) + "\n"
+
+    async def archive():
+        sink = _ZipSink()
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as zf:
+            async for key, future in completed():
+                if future.exception() is not None:
+                    for index in jobs[key]:
+                        zf.writestr(f"{index:03d}_error.txt", str(future.exception()))
+                else:
+                    filename = future.result()
+                    data = (TEMP_DIR / filename).read_bytes()
+                    for index in jobs[key]:
+                        zf.writestr(f"{index:03d}_{Path(filename).name}", data)
+                yield sink.drain()
+        yield sink.drain()
+
+    if batch.output == "zip":
+        return StreamingResponse(
+            archive(), media_type="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="batch.zip"'}
+        )
+    return StreamingResponse(manifest(), media_type="application/x-ndjson")
+
+def render_clone(
+    voice_file: UploadFile,
+    temp_dir: str,
+    speaker_id: Optional[str],
+    text: str,
+    language: str,
+    emotion: Optional[str],
+    effects: tuple,
+    encoding: tuple,
+    response_mode: str,
+    store_output: bool
+) -> tuple:
+    """(store path, inline audio bytes, metadata) of a /clone request; unused parts are None
+
+    Blocking (reference preparation, XTTS under its lock, encoding), so it
+    runs on clone_executor.
+    """
+    voice_path, _ = prepare_reference(voice_file, temp_dir, speaker_id)
+
+    # The same reference, text and settings resolve to the stored output
+    digest = clone_digest(voice_path, text, language, emotion, *effects)
+    output_name = find_output(digest, ("wav",))
+    if output_name is None:
+        # Generate and post-process the cloned voice straight into memory
+        audio = synthesize_cloned(voice_path, text, language, emotion, *effects)
+        if not store_output:
+            return None, encode_rendition(audio, *encoding), None
+        # Save the final processed audio
+        output_name = publish_output(digest, audio)
+
+    if not store_output:
+        return None, transcoded_bytes(output_store, output_name, *encoding), None
+    output_name = transcode(output_store, output_name, *encoding)
+    if response_mode == "inline":
+        return output_name, (TEMP_DIR / output_name).read_bytes(), None
+    return output_name, None, output_metadata(output_name)
+
 @app.post("/clone")
 async def clone_voice(
     voice_file: UploadFile = File(...),
@@ -271,9 +849,15 @@ async def clone_voice(
     breath_effect: float = Form(0.5),
     intonation: float = Form(0.5),
     articulation: float = Form(0.5),
+    speaker_id: str = Form(None),
+    output_format: str = Form(None),
+    bitrate: int = Form(None),
+    sample_rate: int = Form(None),
+    response_mode: str = Form("url"),
+    persist: bool = Form(False),
     request: Request = None
 ):
-    """Clone voice from sample with emotion support"""
+    """Clone voice from sample with emotion support (formats and response modes as for /generate)"""
     text = preprocess_text(text)
 
     if len(text.strip()) > MAX_TEXT_LENGTH:
@@ -288,67 +872,19 @@ async def clone_voice(
     if emotion and emotion not in EMOTIONS:
         raise HTTPException(status_code=400, detail=f"Invalid emotion. Choose from: {', '.join(EMOTIONS)}")
 
+    validate_response_mode(response_mode)
+    encoding = select_format(output_format, bitrate, sample_rate, request.headers.get("accept"))
+    store_output = response_mode == "url" or persist
+
     # Create temp directory
     temp_dir = tempfile.mkdtemp()
     try:
-        # Save uploaded file (keep original extension)
-        temp_input_path = os.path.join(temp_dir, f"voice_{uuid.uuid4()}{Path(voice_file.filename).suffix}")
-        with open(temp_input_path, "wb") as f:
-            shutil.copyfileobj(voice_file.file, f)
-        
-        # Convert to WAV if needed
-        voice_path = os.path.join(temp_dir, f"voice_{uuid.uuid4()}.wav")
-        if not convert_to_wav(temp_input_path, voice_path):
-            raise HTTPException(status_code=400, detail="Unsupported audio format")
-        
-        # Preprocess the input voice file
-        input_audio = AudioSegment.from_wav(voice_path)
-        input_audio = normalize_audio(input_audio)
-        input_audio.export(voice_path, format="wav")
-
-        # Initialize TTS model
-        tts = TTS(model_name="tts_models/multilingual/multi-dataset/xtts_v2", progress_bar=False, gpu=False)
-
-        # Generate cloned voice
-        output_path = TEMP_DIR / f"cloned_{uuid.uuid4()}.wav"
-        tts.tts_to_file(
-            text=text,
-            speaker_wav=voice_path,
-            language=language,
-            file_path=str(output_path)
+        loop = asyncio.get_running_loop()
+        output_name, data, metadata = await loop.run_in_executor(
+            clone_executor, render_clone, voice_file, temp_dir, speaker_id, text, language, emotion,
+            (speed, breath_effect, intonation, articulation), encoding, response_mode, store_output
         )
 
-        # Load the generated audio for post-processing
-        audio = AudioSegment.from_wav(output_path)
-        
-        # Apply speed adjustment
-        if speed != 1.0:
-            audio = audio.speedup(playback_speed=speed)
-        
-        # Apply breath effect (volume adjustment)
-        if breath_effect != 0.5:
-            gain = (breath_effect - 0.5) * 10  # Convert 0-1 scale to -5 to +5 dB
-            audio = audio.apply_gain(gain)
-            
-        # Apply intonation (pitch shift)
-        if intonation != 0.5:
-            shift = (intonation - 0.5) * 10  # Convert 0-1 scale to -5 to +5 semitones
-            audio = audio._spawn(audio.raw_data, overrides={
-                "frame_rate": int(audio.frame_rate * (2.0 ** (shift / 12.0)))
-            }).set_frame_rate(audio.frame_rate)
-            
-        # Apply articulation (equalization)
-        if articulation != 0.5:
-            # Simple EQ adjustment - boost highs for better articulation
-            audio = audio.high_pass_filter(1000 * articulation)
-        
-        # Apply emotion if specified
-        if emotion:
-            audio = adjust_emotion(audio, emotion)
-            
-        # Save the final processed audio
-        audio.export(output_path, format="wav")
-
     except Exception as e:
         shutil.rmtree(temp_dir, ignore_errors=True)
         raise HTTPException(
@@ -358,24 +894,281 @@ async def clone_voice(
 
     shutil.rmtree(temp_dir, ignore_errors=True)
 
-    # For Android localhost, use 10.0.2.2 instead of localhost
-    base_url = str(request.base_url)
-    if "localhost" in base_url or "127.0.0.1" in base_url:
-        base_url = base_url.replace("localhost", "10.0.2.2").replace("127.0.0.1", "10.0.2.2")
+    if response_mode == "inline":
+        file_url = f"{public_base_url(request)}temp_audio/{output_name}" if store_output else None
+        return audio_response(data, encoding[0], text, language, emotion, file_url)
 
     return JSONResponse(content={
-        "file_url": f"{base_url}temp_audio/{output_path.name}",
+        "file_url": f"{public_base_url(request)}temp_audio/{output_name}",
         "text_length": len(text),
         "language": language,
-        "emotion": emotion or "Neutral"
+        "emotion": emotion or "Neutral",
+        "format": encoding[0],
+        **metadata_fields(output_name, metadata, public_base_url(request))
     })
 
-@app.get("/temp_audio/{filename}")
-async def get_audio(filename: str):
-    file_path = TEMP_DIR / filename
-    if not file_path.exists():
+def compute_noise_profile(voice_file: UploadFile, temp_dir: str, speaker_id: Optional[str]) -> tuple:
+    """(profile key, profile) of an uploaded sample, cached for normalize_audio; blocking"""
+    temp_input_path = os.path.join(temp_dir, f"voice_{uuid.uuid4()}{Path(voice_file.filename).suffix}")
+    with open(temp_input_path, "wb") as f:
+        shutil.copyfileobj(voice_file.file, f)
+
+    voice_path = os.path.join(temp_dir, f"voice_{uuid.uuid4()}.wav")
+    if not convert_to_wav(temp_input_path, voice_path):
+        raise HTTPException(status_code=400, detail="Unsupported audio format")
+
+    audio = AudioBuffer.from_wav(voice_path)
+    key = speaker_id or recording_fingerprint(audio)
+    # Same normalization and channel mix-down as normalize_audio
+    return key, precompute_profile(key, normalize_peak(audio).mono())
+
+@app.post("/noise_profiles")
+async def create_noise_profile(
+    voice_file: UploadFile = File(...),
+    speaker_id: str = Form(None)
+):
+    """Pre-compute and cache the noise profile of a reference sample"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        key, profile = await asyncio.get_running_loop().run_in_executor(
+            clone_executor, compute_noise_profile, voice_file, temp_dir, speaker_id
+        )
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    return JSONResponse(content={"profile_key": key, "frames": profile.n_frames})
+
+def render_job_chunk(state: dict, text: str) -> AudioBuffer:
+    """Synthesize and post-process one chunk of a long-form job"""
+    params = state["params"]
+    if state["kind"] == "clone":
+        audio = xtts_synthesize(text, state["language"], str(JOBS_DIR / state["id"] / "reference.wav"))
+    else:
+        audio = tts_router.synthesize(text, state["language"])
+    # Per-chunk peak normalization would make loudness jump between chunks
+    return apply_voice_effects(
+        audio, params["emotion"], params["speed"], params["breath_effect"],
+        params["intonation"], params["articulation"]
+    )
+
+def register_job_output(path: Path) -> None:
+    """register_output for an assembled long-form WAV, summarized block by block from disk"""
+    register_output(path)
+    store_metadata(path.relative_to(TEMP_DIR).as_posix(), summarize_file(path))
+
+# Clone jobs render one chunk at a time: XTTS is serialized, so more workers
+# would only wait on its lock ahead of interactive /clone requests
+jobs = JobManager(JOBS_DIR, render_job_chunk, TEMP_DIR, on_output=register_job_output, kind_workers={"clone": 1})
+
+@app.on_event("startup")
+async def resume_jobs():
+    """Pick up long-form jobs interrupted by a restart"""
+    jobs.resume_all()
+
+@app.on_event("startup")
+async def start_janitor():
+    """Sweep temp_audio periodically in the background"""
+    async def sweep_forever():
+        while True:
+            await asyncio.sleep(TEMP_AUDIO_SWEEP_INTERVAL)
+            try:
+                await asyncio.to_thread(janitor.sweep)
+                # Jobs go with their outputs; failed ones after the same TTL
+                await asyncio.to_thread(jobs.expire, janitor.ttl)
+            except Exception as e:
+                print(f"temp_audio sweep error: {e}")
+    app.state.janitor_task = asyncio.create_task(sweep_forever())
+
+@app.post("/jobs")
+async def create_job(
+    text_file: UploadFile = File(...),
+    voice_file: UploadFile = File(None),
+    language: str = Form("en"),
+    emotion: str = Form(None),
+    speed: float = Form(1.0),
+    breath_effect: float = Form(0.5),
+    intonation: float = Form(0.5),
+    articulation: float = Form(0.5),
+    speaker_id: str = Form(None)
+):
+    """Start a long-form job from a UTF-8 text file; with voice_file the voice is cloned"""
+    try:
+        text = preprocess_text((await text_file.read()).decode("utf-8-sig"))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Text file must be UTF-8")
+    if not text:
+        raise HTTPException(status_code=400, detail="Text file is empty")
+    if len(text) > MAX_JOB_TEXT_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Text too long (max {MAX_JOB_TEXT_LENGTH} chars)")
+
+    languages = CLONE_LANGUAGES if voice_file else STANDARD_LANGUAGES
+    if language not in languages:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported language. Supported: {', '.join(languages.keys())}"
+        )
+    if emotion and emotion not in EMOTIONS:
+        raise HTTPException(status_code=400, detail=f"Invalid emotion. Choose from: {', '.join(EMOTIONS)}")
+
+    params = {
+        "emotion": emotion, "speed": speed, "breath_effect": breath_effect,
+        "intonation": intonation, "articulation": articulation
+    }
+    reference = None
+    if voice_file:
+        temp_dir = tempfile.mkdtemp()
+        try:
+            voice_path, _ = await asyncio.get_running_loop().run_in_executor(
+                clone_executor, prepare_reference, voice_file, temp_dir, speaker_id
+            )
+            reference = Path(voice_path).read_bytes()
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    kind = "clone" if voice_file else "generate"
+    chunk_chars = ENGINE_CHUNK_CHARS["xtts"] if voice_file else max(ENGINE_CHUNK_CHARS.values())
+    digest = output_store.request_key(
+        "longform", kind, hashlib.sha256(reference).hexdigest() if reference else None, text, language, params
+    )
+    output = output_store.relative(digest, "wav")
+    job = await asyncio.to_thread(jobs.create, kind, text, language, chunk_chars, params, output, reference)
+    return JSONResponse(status_code=202, content={"job_id": job.id, "total_chunks": job.state["total_chunks"]})
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, request: Request):
+    """Progress of a long-form job, with the file URL once it is done"""
+    job = jobs.get(job_id) if all(c in string.hexdigits for c in job_id) else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    state = job.progress()
+    content = {"job_id": job.id}
+    content.update({k: state[k] for k in ("status", "total_chunks", "completed_chunks", "progress", "error")})
+    if state["status"] == "done":
+        content["file_url"] = f"{public_base_url(request)}temp_audio/{state['output']}"
+        content["metadata_url"] = f"{public_base_url(request)}metadata/{state['output']}"
+    return JSONResponse(content=content)
+
+@app.post("/jobs/{job_id}/resume")
+async def resume_job(job_id: str):
+    """Retry a failed long-form job from its checkpoints"""
+    job = jobs.resume(job_id) if all(c in string.hexdigits for c in job_id) else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JSONResponse(content={"job_id": job.id, "status": job.progress()["status"]})
+
+@app.post("/speakers")
+async def register_speaker(
+    voice_file: UploadFile = File(...),
+    speaker_id: str = Form(None)
+):
+    """Store a reference voice so /stream can clone it by speaker_id"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        loop = asyncio.get_running_loop()
+        voice_path, key = await loop.run_in_executor(clone_executor, prepare_reference, voice_file, temp_dir, speaker_id)
+        await loop.run_in_executor(clone_executor, shutil.move, voice_path, speaker_path(key))
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return JSONResponse(content={"speaker_id": key})
+
+# Sentence synthesis for /stream, separate from batch work so streams stay responsive
+stream_executor = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix="stream")
+
+@app.websocket("/stream")
+async def stream_speech(websocket: WebSocket):
+    """Speak text as it arrives (e.g. LLM tokens), streaming 16-bit PCM per sentence
+
+    The first message configures the session: {"language", "emotion", "speed",
+    "breath_effect", "intonation", "articulation", "speaker_id"}. With
+    speaker_id (registered via /speakers) the voice is cloned with XTTS,
+    otherwise the engine router is used. See speech_stream for the protocol.
+    """
+    await websocket.accept()
+    config = await websocket.receive_json()
+    language = config.get("language", "en")
+    emotion = config.get("emotion")
+    speaker_id = config.get("speaker_id")
+    try:
+        params = [float(config.get(k, d)) for k, d in
+                  (("speed", 1.0), ("breath_effect", 0.5), ("intonation", 0.5), ("articulation", 0.5))]
+    except (TypeError, ValueError):
+        params = None
+
+    languages = CLONE_LANGUAGES if speaker_id else STANDARD_LANGUAGES
+    error = None
+    if params is None:
+        error = "speed, breath_effect, intonation and articulation must be numbers"
+    elif language not in languages:
+        error = f"Unsupported language. Supported: {', '.join(languages.keys())}"
+    elif emotion and emotion not in EMOTIONS:
+        error = f"Invalid emotion. Choose from: {', '.join(EMOTIONS)}"
+    elif speaker_id and not speaker_path(speaker_id).exists():
+        error = "Unknown speaker_id; register the voice with /speakers first"
+    if error:
+        await websocket.send_json({"type": "error", "detail": error})
+        await websocket.close(code=1008)
+        return
+
+    def render(sentence: str) -> AudioBuffer:
+        if speaker_id:
+            audio = xtts_synthesize(sentence, language, str(speaker_path(speaker_id)))
+        else:
+            audio = tts_router.synthesize(sentence, language)
+        return apply_voice_effects(audio, emotion, *params)
+
+    chunk_chars = ENGINE_CHUNK_CHARS["xtts"] if speaker_id else ENGINE_CHUNK_CHARS["gtts"]
+    await websocket.send_json({"type": "ready"})
+    metrics.incr("stream_sessions")
+    await SpeechStream(websocket, SentenceStream(language, chunk_chars), render, stream_executor).run()
+
+def resolve_output(name: str) -> Path:
+    """Absolute path of a stored output; 404 for anything outside temp_audio or hidden"""
+    file_path = (TEMP_DIR / name).resolve()
+    if TEMP_DIR.resolve() not in file_path.parents or any(part.startswith(".") for part in Path(name).parts):
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(file_path, media_type="audio/wav", filename=filename)
+    return file_path
+
+# Media types of served files by extension
+AUDIO_MEDIA_TYPES = {spec.ext: spec.media_type for spec in OUTPUT_FORMATS.values()}
+
+@app.api_route("/temp_audio/{name:path}", methods=["GET", "HEAD"])
+async def get_audio(name: str, request: Request):
+    """Serve a stored output with Range, ETag and conditional GET support"""
+    media_type = AUDIO_MEDIA_TYPES.get(Path(name).suffix[1:], "application/octet-stream")
+    entry = hot_cache.get(name)
+    if entry is not None:
+        janitor.touch(name)
+        response = serve_bytes(request, entry.data, entry.mtime, entry.etag, entry.stored, media_type)
+        metrics.incr(f"audio_responses_{response.status_code}")
+        return response
+
+    file_path = resolve_output(name)
+    try:
+        response = serve_file(request, file_path, media_type)
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=404, detail="File not found")
+    janitor.touch(file_path.relative_to(TEMP_DIR.resolve()).as_posix())
+    metrics.incr(f"audio_responses_{response.status_code}")
+    return response
+
+@app.get("/metadata/{name:path}")
+async def get_output_metadata(name: str):
+    """Duration, loudness and peak/RMS waveform arrays of a stored output"""
+    file_path = resolve_output(name)
+    if not file_path.is_file():
+        raise HTTPException(status_code=404, detail="File not found")
+    name = file_path.relative_to(TEMP_DIR.resolve()).as_posix()
+    try:
+        metadata = await asyncio.to_thread(output_metadata, name)
+    except RuntimeError as e:
+        raise HTTPException(status_code=422, detail=f"Cannot read audio: {e}")
+    janitor.touch(sidecar(Path(name)).as_posix())
+    # The summary of a content-addressed output is cached as long as the output
+    _, stored = file_etag(file_path, file_path.stat())
+    return JSONResponse(
+        content=metadata,
+        headers={"Cache-Control": STORED_CACHE_CONTROL if stored else MUTABLE_CACHE_CONTROL}
+    )
 
 @app.get("/supported_languages")
 async def get_supported_languages():
@@ -385,6 +1178,11 @@ async def get_supported_languages():
         "clone": CLONE_LANGUAGES
     })
 
+@app.get("/metrics")
+async def get_metrics():
+    """Get in-process pipeline metrics"""
+    return JSONResponse(content=metrics.snapshot())
+
 @app.get("/supported_emotions")
 async def get_supported_emotions():
     """Get supported emotions"""
@@ -0,0 +1,24 @@
+"""Lightweight in-process metrics shared by the voice API modules"""
+import threading
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+
+
+def incr(name: str, value: float = 1) -> None:
+    """Add value to a monotonically increasing counter"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name: str, value: float) -> None:
+    """Record the current value of a gauge"""
+    with _lock:
+        _gauges[name] = value
+
+
+def snapshot() -> dict:
+    """Return a copy of all counters and gauges"""
+    with _lock:
+        return {"counters": dict(_counters), "gauges": dict(_gauges)}
@@ -0,0 +1,119 @@
+"""Output format selection and cached transcoding of stored outputs"""
+from typing import NamedTuple, Optional
+
+import metrics
+from audio_buffer import AudioBuffer, encode_audio, read_audio
+from output_store import OutputStore
+
+
+class OutputFormat(NamedTuple):
+    media_type: str
+    ext: str
+    bitrate: Optional[int]  # default, bits/s
+    bitrate_range: Optional[tuple]  # accepted (min, max), bits/s
+    sample_rate: Optional[int]  # default output rate, None keeps the source rate
+
+
+OUTPUT_FORMATS = {
+    "wav": OutputFormat("audio/wav", "wav", None, None, None),
+    "opus": OutputFormat("audio/ogg", "opus", 24000, (6000, 256000), 24000),
+    "mp3": OutputFormat("audio/mpeg", "mp3", 32000, (8000, 320000), None),
+    "aac": OutputFormat("audio/aac", "aac", 48000, (16000, 320000), None),
+}
+
+# Accept media types and the formats they select
+_MEDIA_TYPES = {
+    "audio/wav": "wav", "audio/x-wav": "wav", "audio/wave": "wav",
+    "audio/ogg": "opus", "audio/opus": "opus",
+    "audio/mpeg": "mp3", "audio/mp3": "mp3",
+    "audio/aac": "aac", "audio/mp4": "aac",
+}
+
+# Rates Opus can encode at; other requests are rounded up to the next one
+_OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+
+SAMPLE_RATES = (8000, 11025, 12000, 16000, 22050, 24000, 32000, 44100, 48000)
+
+DEFAULT_FORMAT = "wav"
+
+
+def negotiate_format(output_format: Optional[str], accept: Optional[str]) -> str:
+    """Explicit output_format, else the client's most preferred Accept type we produce"""
+    if output_format:
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output_format. Choose from: {', '.join(OUTPUT_FORMATS)}")
+        return output_format
+
+    choices = []
+    for position, part in enumerate((accept or "").split(",")):
+        media_type, *params = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        fmt = _MEDIA_TYPES.get(media_type.lower())
+        if fmt and q > 0:
+            choices.append((-q, position, fmt))
+    return min(choices)[2] if choices else DEFAULT_FORMAT
+
+
+def resolve_encoding(fmt: str, bitrate_kbps: Optional[int], sample_rate: Optional[int]) -> tuple:
+    """Validated (bitrate in bits/s, sample rate) requested for a format; None means default"""
+    spec = OUTPUT_FORMATS[fmt]
+    bitrate = bitrate_kbps * 1000 if bitrate_kbps and spec.bitrate_range else None
+    if bitrate is not None and not spec.bitrate_range[0] <= bitrate <= spec.bitrate_range[1]:
+        low, high = (b // 1000 for b in spec.bitrate_range)
+        raise ValueError(f"bitrate for {fmt} must be between {low} and {high} kbps")
+
+    if sample_rate is not None and sample_rate not in SAMPLE_RATES:
+        raise ValueError(f"Unsupported sample_rate. Choose from: {', '.join(map(str, SAMPLE_RATES))}")
+    return bitrate, sample_rate
+
+
+def encode_rendition(audio: AudioBuffer, fmt: str, bitrate: Optional[int], sample_rate: Optional[int]) -> bytes:
+    """Encode audio in a format, applying the format's default bitrate and sample rate"""
+    spec = OUTPUT_FORMATS[fmt]
+    sample_rate = sample_rate or spec.sample_rate
+    if fmt == "opus":
+        sample_rate = next(rate for rate in _OPUS_RATES if rate >= (sample_rate or audio.sample_rate))
+    if sample_rate is not None:
+        audio = audio.resample(sample_rate)
+    metrics.incr(f"transcode_{fmt}")
+    return encode_audio(audio, fmt, bitrate or spec.bitrate)
+
+
+def _rendition(store: OutputStore, name: str, fmt: str, bitrate: Optional[int], sample_rate: Optional[int]) -> tuple:
+    # (digest, existing path) of a rendition; the source itself when it already fits
+    spec = OUTPUT_FORMATS[fmt]
+    if name.endswith("." + spec.ext) and bitrate is None and sample_rate is None:
+        return None, name
+    digest = store.request_key("transcode", name, fmt, bitrate, sample_rate)
+    return digest, store.find(digest, (spec.ext,))
+
+
+def transcode(store: OutputStore, name: str, fmt: str, bitrate: Optional[int], sample_rate: Optional[int]) -> str:
+    """Stored rendition of the output `name` in a format, encoded on first request
+
+    Renditions are themselves store objects keyed by source, format, bitrate
+    and sample rate, so each variant is encoded once. A source already in
+    the format is returned as-is unless bitrate or sample rate is requested.
+    """
+    digest, existing = _rendition(store, name, fmt, bitrate, sample_rate)
+    if existing is not None:
+        return existing
+
+    source = store.root / name
+    encoded = encode_rendition(read_audio(source), fmt, bitrate, sample_rate)
+    metrics.incr("transcode_bytes_saved", max(0, source.stat().st_size - len(encoded)))
+    return store.publish_bytes(digest, OUTPUT_FORMATS[fmt].ext, encoded)
+
+
+def transcoded_bytes(store: OutputStore, name: str, fmt: str, bitrate: Optional[int], sample_rate: Optional[int]) -> bytes:
+    """Like transcode, but a missing rendition is encoded in memory and not stored"""
+    _, existing = _rendition(store, name, fmt, bitrate, sample_rate)
+    if existing is not None:
+        return (store.root / existing).read_bytes()
+    return encode_rendition(read_audio(store.root / name), fmt, bitrate, sample_rate)
@@ -0,0 +1,72 @@
+"""Content-addressed storage for generated audio
+
+Outputs are named by a digest of their canonical request key, so repeating
+a request resolves to the file that already exists instead of producing a
+new copy. Files live in two levels of shard directories
+(ab/cd/abcd….wav) to keep directory sizes small, and are written to a
+temporary name and renamed into place so readers never see partial files.
+"""
+import hashlib
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+import metrics
+
+# Bump when rendering changes so old outputs are not served for new requests
+STORE_KEY_VERSION = 1
+
+
+class OutputStore:
+    """Sharded, write-once audio files under root addressed by request digest"""
+
+    def __init__(self, root: Path, on_publish: Optional[Callable[[Path, Optional[bytes]], None]] = None):
+        self.root = root
+        self.on_publish = on_publish
+
+    @staticmethod
+    def request_key(*parts) -> str:
+        """Digest of the canonical JSON encoding of parts"""
+        canonical = json.dumps([STORE_KEY_VERSION, *parts], sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    @staticmethod
+    def relative(digest: str, ext: str) -> str:
+        """Path of an object relative to root (also its URL path under /temp_audio)"""
+        return f"{digest[:2]}/{digest[2:4]}/{digest}.{ext}"
+
+    def find(self, digest: str, exts: Iterable[str]) -> Optional[str]:
+        """Relative path of an existing object with one of the given extensions"""
+        for ext in exts:
+            name = self.relative(digest, ext)
+            if (self.root / name).exists():
+                metrics.incr("output_store_hits")
+                return name
+        metrics.incr("output_store_misses")
+        return None
+
+    def publish(self, digest: str, ext: str, write: Callable[[Path], None], data: Optional[bytes] = None) -> str:
+        """Create an object by calling write(tmp_path), then renaming it into place
+
+        data, the object's content when the caller has it in memory, is passed
+        on to on_publish so it need not read the file back.
+        """
+        name = self.relative(digest, ext)
+        path = self.root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            write(tmp)
+            os.replace(tmp, path)
+        finally:
+            tmp.unlink(missing_ok=True)
+        metrics.incr("output_store_writes")
+        if self.on_publish is not None:
+            self.on_publish(path, data)
+        return name
+
+    def publish_bytes(self, digest: str, ext: str, data: bytes) -> str:
+        """publish for content already encoded in memory"""
+        return self.publish(digest, ext, lambda path: path.write_bytes(data), data)
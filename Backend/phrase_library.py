@@ -0,0 +1,118 @@
+"""Pre-rendered library of fixed app phrases
+
+An offline build renders every phrase variant (language x emotion x voice)
+into the output store under the same digest a live request would have, and
+writes a compact index of those digests. The server loads the index at
+startup and answers matching requests straight from it: no synthesis and
+no filesystem lookup. Library files are exempt from temp_audio eviction.
+
+Phrase list (JSON), one or more groups:
+    [{"language": "en", "emotions": ["Neutral", "Happy"], "speakers": [null, "alice"],
+      "phrases": ["Welcome back!", "Something went wrong."]}]
+"null" is the standard engine; other speakers are ids registered via /speakers.
+
+Build from the Backend directory:  python -m phrase_library phrases.json
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+import metrics
+from output_store import OutputStore
+
+PHRASE_INDEX = Path(os.environ.get("PHRASE_INDEX", "phrase_index.bin"))
+
+# Index records: 32-byte digest + 1-byte extension code
+_EXTS = ("wav", "mp3")
+_RECORD = 33
+
+
+class PhraseIndex:
+    """Digest -> stored output path for every pre-rendered variant"""
+
+    def __init__(self, entries: Optional[Dict[bytes, str]] = None):
+        self._entries = entries or {}
+
+    @classmethod
+    def load(cls, path: Path = PHRASE_INDEX, root: Optional[Path] = None) -> "PhraseIndex":
+        """Read an index; with root, entries whose file is missing there are dropped"""
+        if not path.exists():
+            return cls()
+        data = path.read_bytes()
+        entries = {
+            data[i:i + 32]: _EXTS[data[i + 32]]
+            for i in range(0, len(data) - len(data) % _RECORD, _RECORD)
+        }
+        if root is not None:
+            entries = {
+                digest: ext for digest, ext in entries.items()
+                if (root / OutputStore.relative(digest.hex(), ext)).exists()
+            }
+        return cls(entries)
+
+    def save(self, path: Path = PHRASE_INDEX) -> None:
+        data = b"".join(digest + bytes([_EXTS.index(ext)]) for digest, ext in sorted(self._entries.items()))
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def add(self, digest: str, name: str) -> None:
+        self._entries[bytes.fromhex(digest)] = name.rsplit(".", 1)[1]
+
+    def lookup(self, digest: str, exts: Iterable[str]) -> Optional[str]:
+        """Store path of a pre-rendered variant stored with one of the given extensions"""
+        ext = self._entries.get(bytes.fromhex(digest))
+        if ext is None or ext not in exts:
+            return None
+        metrics.incr("phrase_library_hits")
+        return OutputStore.relative(digest, ext)
+
+    def names(self) -> Iterable[str]:
+        return (OutputStore.relative(digest.hex(), ext) for digest, ext in self._entries.items())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def variants(groups: list) -> Iterator[tuple]:
+    """(text, language, emotion, speaker_id) for every combination in a phrase list"""
+    for group in groups:
+        for speaker_id in group.get("speakers", [None]):
+            for emotion in group.get("emotions", ["Neutral"]):
+                for text in group["phrases"]:
+                    yield text, group["language"], emotion, speaker_id
+
+
+def build(groups: list, render: Callable[..., tuple], workers: int, index: PhraseIndex) -> PhraseIndex:
+    """Render all variants in parallel; render(...) returns (digest, store path)"""
+    jobs = list(variants(groups))
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for done, (digest, name) in enumerate(executor.map(lambda job: render(*job), jobs), 1):
+            index.add(digest, name)
+            if done % 50 == 0 or done == len(jobs):
+                print(f"{done}/{len(jobs)} variants ({time.perf_counter() - started:.1f} s)")
+    return index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pre-render a phrase list into the output store")
+    parser.add_argument("phrases", type=Path, help="JSON phrase list")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--index", type=Path, default=PHRASE_INDEX)
+    args = parser.parse_args()
+
+    # The server module provides the same rendering (and digests) as live requests
+    import main as server
+
+    index = build(json.loads(args.phrases.read_text()), server.render_phrase, args.workers, PhraseIndex.load(args.index))
+    index.save(args.index)
+    print(f"{len(index)} phrases indexed in {args.index}")
+
+
+if __name__ == "__main__":
+    main()
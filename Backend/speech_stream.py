@@ -0,0 +1,203 @@
+"""WebSocket session that speaks text as it arrives, one sentence at a time
+
+After the endpoint has accepted the session configuration and sent
+{"type": "ready"}:
+
+Client -> server (JSON text frames):
+    {"type": "text", "text": "..."}   more text; complete sentences are synthesized at once
+    {"type": "flush"}                 end of utterance; the remainder is spoken, then "end" is sent
+    {"type": "cancel"}                drop pending text and audio; "cancelled" is sent
+
+Server -> client:
+    {"type": "sentence", "seq", "text", "sample_rate", "channels", "frames"}
+        followed by binary frames of little-endian 16-bit PCM
+    {"type": "end"} | {"type": "cancelled"} | {"type": "error", "seq", "detail"}
+
+Back-pressure: at most STREAM_LOOKAHEAD sentences are synthesized ahead of
+the one being sent, sends wait for the client, and once more than
+STREAM_MAX_PENDING_CHARS of text is queued further text (and flushes) are
+held back unsegmented. Messages are still read meanwhile so a cancel takes
+effect at once; only if the held text also exceeds STREAM_MAX_PENDING_CHARS
+does the session stop reading until it has been taken up.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor
+from typing import Callable
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+import metrics
+from audio_buffer import AudioBuffer
+from text_segmentation import SentenceStream
+
+# Sentences synthesized ahead of the one currently being sent
+STREAM_LOOKAHEAD = int(os.environ.get("STREAM_LOOKAHEAD", "2"))
+
+# Queued text (characters) above which the session stops reading from the client
+STREAM_MAX_PENDING_CHARS = int(os.environ.get("STREAM_MAX_PENDING_CHARS", "20000"))
+
+# Audio per binary WebSocket frame (seconds)
+STREAM_FRAME_SECONDS = 0.25
+
+_END = object()
+
+
+class SpeechStream:
+    """One WebSocket client; render(text) returns the finished audio for a sentence"""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        sentences: SentenceStream,
+        render: Callable[[str], AudioBuffer],
+        executor: Executor
+    ):
+        self.websocket = websocket
+        self.sentences = sentences
+        self.render = render
+        self.executor = executor
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.inflight = deque()
+        self.generation = 0
+        self.seq = 0
+        self.pending_chars = 0
+        self.room = asyncio.Event()
+        self.room.set()
+        self.held = deque()
+        self.held_chars = 0
+        self.reading = asyncio.Event()
+        self.reading.set()
+        self._send_lock = asyncio.Lock()
+
+    async def run(self) -> None:
+        sender = asyncio.create_task(self._send_loop())
+        try:
+            await self._receive_loop()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            sender.cancel()
+            self._cancel_inflight()
+            await asyncio.gather(sender, return_exceptions=True)
+
+    async def _receive_loop(self) -> None:
+        while True:
+            await self.reading.wait()
+            message = await self.websocket.receive_json()
+            kind = message.get("type")
+            if kind in ("text", "flush"):
+                if self.room.is_set() and not self.held:
+                    self._accept(message)
+                else:
+                    self._hold(message)
+            elif kind == "cancel":
+                self._cancel()
+                await self._send_json({"type": "cancelled"})
+            else:
+                await self._send_json({"type": "error", "detail": f"Unknown message type: {kind}"})
+
+    def _accept(self, message: dict) -> None:
+        if message["type"] == "text":
+            self._enqueue(self.sentences.feed(str(message.get("text", ""))))
+        else:
+            self._enqueue(self.sentences.flush())
+            self.queue.put_nowait((self.generation, _END))
+
+    def _hold(self, message: dict) -> None:
+        self.held.append(message)
+        self.held_chars += len(str(message.get("text", "")))
+        if self.held_chars > STREAM_MAX_PENDING_CHARS:
+            self.reading.clear()
+
+    def _release(self) -> None:
+        # Take up held messages in order while there is room
+        while self.held and self.room.is_set():
+            message = self.held.popleft()
+            self.held_chars -= len(str(message.get("text", "")))
+            self._accept(message)
+        if self.held_chars <= STREAM_MAX_PENDING_CHARS:
+            self.reading.set()
+
+    def _enqueue(self, sentences) -> None:
+        for sentence in sentences:
+            self.queue.put_nowait((self.generation, sentence, time.perf_counter()))
+            self.pending_chars += len(sentence)
+        if self.pending_chars > STREAM_MAX_PENDING_CHARS:
+            self.room.clear()
+
+    def _cancel(self) -> None:
+        # Everything queued or in flight belongs to the old generation and is dropped
+        self.generation += 1
+        self.sentences.reset()
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self._cancel_inflight()
+        self.pending_chars = 0
+        self.room.set()
+        self.held.clear()
+        self.held_chars = 0
+        self.reading.set()
+        metrics.incr("stream_cancellations")
+
+    def _cancel_inflight(self) -> None:
+        for _, _, _, future in self.inflight:
+            if future is not None:
+                future.cancel()
+        self.inflight.clear()
+
+    def _start(self, item) -> tuple:
+        if item[1] is _END:
+            return item[0], None, None, None
+        generation, sentence, queued = item
+        loop = asyncio.get_running_loop()
+        return generation, sentence, queued, loop.run_in_executor(self.executor, self.render, sentence)
+
+    async def _send_loop(self) -> None:
+        while True:
+            # Keep up to STREAM_LOOKAHEAD sentences synthesizing while the head is sent
+            while len(self.inflight) < STREAM_LOOKAHEAD and (not self.queue.empty() or not self.inflight):
+                self.inflight.append(self._start(await self.queue.get()))
+            generation, sentence, queued, future = self.inflight.popleft()
+            if generation != self.generation:
+                continue
+            if future is None:
+                await self._send_json({"type": "end"})
+                continue
+
+            await asyncio.wait([future])
+            if future.cancelled() or generation != self.generation:
+                continue
+            self.pending_chars -= len(sentence)
+            if self.pending_chars <= STREAM_MAX_PENDING_CHARS:
+                self.room.set()
+                self._release()
+
+            self.seq += 1
+            if future.exception() is not None:
+                metrics.incr("stream_errors")
+                await self._send_json({"type": "error", "seq": self.seq, "detail": str(future.exception())})
+                continue
+            await self._send_audio(generation, sentence, future.result(), queued)
+
+    async def _send_audio(self, generation: int, sentence: str, audio: AudioBuffer, queued: float) -> None:
+        async with self._send_lock:
+            await self.websocket.send_json({
+                "type": "sentence", "seq": self.seq, "text": sentence,
+                "sample_rate": audio.sample_rate, "channels": audio.channels, "frames": len(audio)
+            })
+            step = max(1, int(audio.sample_rate * STREAM_FRAME_SECONDS))
+            for start in range(0, len(audio), step):
+                # Stop mid-sentence when the client cancels
+                if generation != self.generation:
+                    return
+                await self.websocket.send_bytes(audio[start:start + step].to_pcm16())
+                if start == 0:
+                    metrics.set_gauge("stream_sentence_latency", time.perf_counter() - queued)
+        metrics.incr("stream_sentences")
+
+    async def _send_json(self, message: dict) -> None:
+        async with self._send_lock:
+            await self.websocket.send_json(message)
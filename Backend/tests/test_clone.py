@@ -0,0 +1,47 @@
+import io
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+
+class FakeXTTS:
+    """Records which reference each conditioning latent was computed from"""
+
+    def __init__(self):
+        self.conditioned = []
+        self.synthesizer = SimpleNamespace(tts_model=self, output_sample_rate=24000)
+
+    def get_conditioning_latents(self, audio_path):
+        with open(audio_path[0], "rb") as f:
+            reference = f.read()
+        self.conditioned.append(reference)
+        return reference, None
+
+    def inference(self, text, language, gpt_cond_latent, speaker_embedding):
+        return {"wav": np.full(2400, 0.2, dtype=np.float32)}
+
+
+def recording(frequency: float) -> bytes:
+    t = np.arange(24000) / 24000
+    out = io.BytesIO()
+    sf.write(out, 0.3 * np.sin(2 * np.pi * frequency * t), 24000, format="WAV")
+    return out.getvalue()
+
+
+def test_new_recording_under_a_reused_speaker_id_is_conditioned_again(monkeypatch):
+    main = pytest.importorskip("main")
+    from fastapi.testclient import TestClient
+
+    xtts = FakeXTTS()
+    monkeypatch.setattr(main, "_xtts", xtts)
+    client = TestClient(main.app)
+    for frequency in (180.0, 320.0):
+        response = client.post(
+            "/clone", data={"text": "Hello there.", "speaker_id": "alice"},
+            files={"voice_file": ("voice.wav", recording(frequency), "audio/wav")},
+        )
+        assert response.status_code == 200
+    assert len(xtts.conditioned) == 2
+    assert xtts.conditioned[0] != xtts.conditioned[1]
@@ -0,0 +1,55 @@
+import math
+
+import numpy as np
+import pytest
+
+from audio_buffer import AudioBuffer
+from denoise import SpectralGate, decide_noise_reduction, reduce_noise
+
+SR = 24000
+
+
+def speech_then_noise():
+    # 0.8 s of a voiced, gliding harmonic signal, then background noise only
+    rng = np.random.default_rng(0)
+    t = np.arange(3 * SR) / SR
+    phase = 2 * np.pi * np.cumsum(150 + 80 * np.sin(2 * np.pi * 1.3 * t)) / SR
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+    speech = (0.2 * voiced * (t < 0.8) * (0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2)).astype(np.float32)
+    return speech, speech + (0.01 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def test_clip_shorter_than_a_frame_is_skipped_with_finite_levels():
+    decision = decide_noise_reduction(np.full(100, 0.1, dtype=np.float32), 24000)
+    assert decision.strength == "skip"
+    assert math.isfinite(decision.noise_floor_db)
+    assert math.isfinite(decision.snr_db)
+
+
+def test_metrics_serialize_after_normalizing_a_short_clip():
+    main = pytest.importorskip("main")
+    from fastapi.testclient import TestClient
+
+    buf = AudioBuffer(np.full(100, 0.1, dtype=np.float32), 24000)
+    assert len(main.normalize_audio(buf)) == 100
+    response = TestClient(main.app).get("/metrics")
+    assert response.status_code == 200
+    assert math.isfinite(response.json()["gauges"]["denoise_last_snr_db"])
+
+
+def test_speech_at_the_start_is_kept_without_a_cached_profile():
+    speech, clip = speech_then_noise()
+    reduced = reduce_noise(clip, 0.75)
+    voiced = slice(0, int(0.8 * SR))
+    error = np.sqrt(np.mean((reduced[voiced] - speech[voiced]) ** 2)) / np.sqrt(np.mean(speech[voiced] ** 2))
+    assert error < 0.2
+    assert np.std(reduced[int(1.2 * SR):]) < 0.5 * np.std(clip[int(1.2 * SR):])
+
+
+def test_whole_clip_result_does_not_depend_on_chunking():
+    _, clip = speech_then_noise()
+    gate = SpectralGate(prop_decrease=0.75)
+    gate.set_profile(gate.estimate_profile(clip))
+    pieces = [gate.process(clip[i:i + 777]) for i in range(0, len(clip), 777)] + [gate.flush()]
+    streamed = np.concatenate(pieces)[gate.latency:gate.latency + len(clip)]
+    assert np.abs(reduce_noise(clip, 0.75) - streamed).max() < 1e-5
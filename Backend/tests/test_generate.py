@@ -0,0 +1,42 @@
+import pytest
+
+from tts_engines import EngineRouter, ToneEngine
+
+
+class FailingEngine(ToneEngine):
+    name = "gtts"
+
+    def __init__(self):
+        super().__init__()
+        self.failing = True
+
+    def synthesize(self, text, lang):
+        if self.failing:
+            raise RuntimeError("service unavailable")
+        return super().synthesize(text, lang)
+
+
+class LocalTone(ToneEngine):
+    name = "local"
+
+    def __init__(self):
+        super().__init__(seconds_per_char=0.03)
+
+
+def test_fallback_output_is_not_stored_under_the_primary_digest(monkeypatch):
+    main = pytest.importorskip("main")
+    from fastapi.testclient import TestClient
+
+    primary = FailingEngine()
+    router = EngineRouter([primary, LocalTone()], config={"default": ["gtts", "local"]})
+    monkeypatch.setattr(main, "tts_router", router)
+    client = TestClient(main.app)
+    data = {"text": "A fallback voice must not be cached.", "emotion": "Happy"}
+
+    fallback = client.post("/generate", data=data).json()
+    primary.failing = False
+    router._latency.clear()
+    recovered = client.post("/generate", data=data).json()
+    assert recovered["file_url"] != fallback["file_url"]
+    # Later requests get the primary engine's output
+    assert client.post("/generate", data=data).json()["file_url"] == recovered["file_url"]
@@ -0,0 +1,41 @@
+import io
+
+import pytest
+import soundfile as sf
+
+from benchmarks.gtts_standin import StandInServer, tone_mp3
+from gtts_engine import GTTSEngine, join_mp3
+
+
+def decoded_seconds(data: bytes) -> float:
+    samples, sample_rate = sf.read(io.BytesIO(data))
+    return len(samples) / sample_rate
+
+
+def test_joined_chunks_decode_to_their_full_length():
+    chunks = [tone_mp3(1.0), tone_mp3(1.2), tone_mp3(0.8)]
+    # Decoders stop at the first chunk's Xing frame count when chunks are simply concatenated
+    assert decoded_seconds(b"".join(chunks)) < 1.5
+    assert decoded_seconds(join_mp3(chunks)) >= sum(decoded_seconds(chunk) for chunk in chunks)
+
+
+def test_fast_path_file_matches_sidecar_duration(monkeypatch):
+    main = pytest.importorskip("main")
+    from fastapi.testclient import TestClient
+
+    with StandInServer(latency=0.0) as server:
+        monkeypatch.setattr(main.tts_router, "engines", {"gtts": GTTSEngine(url=server.url)})
+        monkeypatch.setattr(main.tts_router, "config", {"default": ["gtts"]})
+        client = TestClient(main.app)
+        fast_paths = main.metrics.snapshot()["counters"].get("generate_fast_path", 0)
+        response = client.post("/generate", data={
+            "text": "First sentence here. Second sentence here. Third one.", "output_format": "mp3",
+        })
+        assert response.status_code == 200
+        body = response.json()
+        name = body["file_url"].split("/temp_audio/", 1)[1]
+        data = client.get(f"/temp_audio/{name}").content
+        assert main.metrics.snapshot()["counters"]["generate_fast_path"] == fast_paths + 1
+
+    assert decoded_seconds(data) > 2.5
+    assert abs(decoded_seconds(data) - body["duration"]) < 0.01
@@ -0,0 +1,71 @@
+import time
+
+import pytest
+import requests
+
+import metrics
+from benchmarks.gtts_standin import StandInServer
+from gtts_engine import GTTSEngine
+
+
+def counter(name: str) -> float:
+    return metrics.snapshot()["counters"].get(name, 0)
+
+
+def engine_for(server: StandInServer, hedge_percentile: float = 95) -> GTTSEngine:
+    engine = GTTSEngine(url=server.url, hedge_percentile=hedge_percentile, chunk_deadline=5.0)
+    engine.cache.max_bytes = 0
+    if hedge_percentile:
+        # Enough fast samples for the tracker to set a hedge delay
+        for _ in range(engine.latency.min_samples):
+            engine.latency.record(0.01)
+    return engine
+
+
+def test_hedge_rescues_a_stalled_request():
+    with StandInServer(latency=0.01, slow_latency=3.0, script=["slow"]) as server:
+        engine = engine_for(server)
+        hedges = counter("gtts_chunk_hedges")
+        started = time.monotonic()
+        assert engine.fetch_chunk("Hello there.", "en")
+        assert time.monotonic() - started < 1.0
+        assert counter("gtts_chunk_hedges") == hedges + 1
+        assert server.requests == 2
+
+
+def test_failed_request_is_retried():
+    with StandInServer(latency=0.01, script=["fail"]) as server:
+        engine = engine_for(server, hedge_percentile=0)
+        retries = counter("gtts_chunk_retries")
+        assert engine.fetch_chunk("Hello there.", "en")
+        assert counter("gtts_chunk_retries") == retries + 1
+        assert server.requests == 2
+
+
+def test_non_gtts_error_before_hedge_is_retried(monkeypatch):
+    with StandInServer(latency=0.01) as server:
+        engine = engine_for(server)
+        request = engine._request
+        calls = []
+
+        def flaky(text, lang, timeout):
+            calls.append(text)
+            if len(calls) == 1:
+                raise requests.ConnectionError("connection reset")
+            return request(text, lang, timeout)
+
+        monkeypatch.setattr(engine, "_request", flaky)
+        retries = counter("gtts_chunk_retries")
+        assert engine.fetch_chunk("Hello there.", "en")
+        assert counter("gtts_chunk_retries") == retries + 1
+        assert len(calls) == 2
+
+
+def test_exhausted_retries_raise_gtts_error():
+    from gtts.tts import gTTSError
+
+    with StandInServer(latency=0.01, script=["fail"] * 3) as server:
+        engine = engine_for(server, hedge_percentile=0)
+        with pytest.raises(gTTSError):
+            engine.fetch_chunk("Hello there.", "en")
+        assert server.requests == 3
@@ -0,0 +1,70 @@
+import time
+import wave
+
+import numpy as np
+
+from audio_buffer import AudioBuffer
+from longform import CROSSFADE_SECONDS, Job, JobManager
+from tts_engines import ToneEngine
+
+SR = 24000
+
+
+def assemble(tmp_path, lengths):
+    manager = JobManager(tmp_path / "jobs", render=None, output_dir=tmp_path / "out", workers=1)
+    directory = tmp_path / "jobs" / "job"
+    directory.mkdir()
+    job = Job(directory, {"id": "job", "sample_rate": SR, "channels": 1, "output": "book.wav"})
+    job.chunks = [f"chunk {i}" for i in range(len(lengths))]
+    for index, length in enumerate(lengths):
+        job.chunk_path(index).write_bytes(AudioBuffer(np.full(length, 0.5, dtype=np.float32), SR).to_pcm16())
+    manager._assemble(job)
+    with wave.open(str(tmp_path / "out" / "book.wav"), "rb") as wav:
+        return np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2")
+
+
+def test_empty_chunk_is_skipped_without_dropping_audio(tmp_path):
+    fade = int(SR * CROSSFADE_SECONDS)
+    frames = assemble(tmp_path, [4800, 0, 4800])
+    # One crossfade joins the two non-empty chunks
+    assert len(frames) == 2 * 4800 - fade
+    # Constant-level chunks crossfade into the same level: no gap or click
+    assert np.abs(frames.astype(np.int32) - frames[0]).max() <= 1
+
+
+def test_empty_first_and_last_chunks(tmp_path):
+    assert len(assemble(tmp_path, [0, 4800, 0])) == 4800
+
+
+def run_job(manager, text="One sentence here. Another sentence there."):
+    job = manager.create("generate", text, "en", 40, {}, "book.wav")
+    for _ in range(200):
+        if job.progress()["status"] in ("done", "failed"):
+            break
+        time.sleep(0.01)
+    return job
+
+
+def test_job_expires_with_its_output(tmp_path):
+    engine = ToneEngine()
+    manager = JobManager(tmp_path / "jobs", lambda state, text: engine.synthesize(text, "en"), tmp_path / "out")
+    job = run_job(manager)
+    assert job.progress()["status"] == "done"
+    assert sorted(p.name for p in job.directory.iterdir()) == ["job.json"]
+    assert manager.get(job.id) is not None
+
+    (tmp_path / "out" / "book.wav").unlink()
+    assert manager.get(job.id) is None
+    assert not job.directory.exists()
+
+
+def test_expire_removes_idle_failed_jobs(tmp_path):
+    def fail(state, text):
+        raise RuntimeError("engine down")
+
+    manager = JobManager(tmp_path / "jobs", fail, tmp_path / "out")
+    job = run_job(manager)
+    assert job.progress()["status"] == "failed"
+    assert manager.expire(max_age=3600) == []
+    assert manager.expire(max_age=0) == [job.id]
+    assert manager.get(job.id) is None
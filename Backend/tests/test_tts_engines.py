@@ -0,0 +1,55 @@
+import math
+
+import pytest
+
+from tts_engines import EngineRouter, ToneEngine
+
+
+class Broken(ToneEngine):
+    name = "broken"
+
+    def synthesize(self, text, lang):
+        raise RuntimeError("down")
+
+
+def names(engines):
+    return [engine.name for engine in engines]
+
+
+def router(*engines, budget=0.03):
+    return EngineRouter(list(engines), config={"default": [e.name for e in engines]}, latency_budget=budget)
+
+
+def test_failure_falls_back_to_the_next_engine():
+    r = router(Broken(), ToneEngine())
+    audio, engine = r.synthesize_with_engine("Hello there.", "en")
+    assert engine == "tone"
+    assert len(audio) > 0
+
+
+def test_failed_engine_is_tried_last_until_its_estimate_decays():
+    r = router(Broken(), ToneEngine())
+    r.synthesize("Hello there.", "en")
+    # A failure counts as twice the budget; each pass-over decays it by 5%
+    passes = math.ceil(math.log(0.5) / math.log(0.95))
+    for _ in range(passes):
+        assert names(r.candidates("en")) == ["tone", "broken"]
+    assert names(r.candidates("en")) == ["broken", "tone"]
+    assert r.primary("en") == "broken"
+
+
+def test_latency_is_compared_per_character():
+    slow = ToneEngine(latency=0.2)
+    r = router(slow, Broken(), budget=0.005)
+    # 0.2 s for 200 characters is within 5 ms per character
+    r.synthesize("x" * 200, "en")
+    assert names(r.candidates("en"))[0] == "tone"
+    # ...but the same time for a short text (timed as LATENCY_MIN_CHARS) is not
+    r = router(slow, Broken(), budget=0.005)
+    r.synthesize("x", "en")
+    assert names(r.candidates("en"))[0] == "broken"
+
+
+def test_no_engine_succeeding_raises():
+    with pytest.raises(RuntimeError, match="No TTS engine succeeded"):
+        router(Broken()).synthesize("Hello there.", "en")
@@ -0,0 +1,188 @@
+"""Language-aware text normalization and sentence segmentation for synthesis"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import List, Tuple
+
+# Preferred maximum chunk length (characters) per synthesis engine
+ENGINE_CHUNK_CHARS = {
+    "gtts": 100,
+    "local": 250,
+    "xtts": 200,
+}
+
+# Sentence terminators beyond the common . ! ? …
+_SENTENCE_ENDS = {
+    "zh": "。！？；",
+    "ja": "。！？",
+    "hi": "।॥", "mr": "।॥", "bn": "।॥", "pa": "।॥", "gu": "।॥",
+    "ta": "।", "te": "।", "kn": "।", "ml": "।",
+    "ar": "؟۔", "ur": "؟۔", "fa": "؟۔",
+    "el": ";;",
+}
+
+# Clause separators used to split sentences that exceed the chunk size
+_CLAUSE_MARKS = ",;:—–、，،؛"
+
+# Languages that do not put a space after sentence-ending punctuation
+_NO_SPACE_LANGUAGES = {"zh", "ja"}
+
+# Abbreviations that end with a period but do not end a sentence
+_ABBREVIATIONS = {
+    "en": {"mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e", "no", "approx"},
+    "es": {"sr", "sra", "srta", "dr", "dra", "ud", "uds", "etc"},
+    "fr": {"m", "mme", "mlle", "dr", "etc"},
+    "de": {"hr", "fr", "dr", "prof", "z.b", "usw", "bzw", "ca", "nr"},
+    "it": {"sig", "dott", "ecc"},
+    "pt": {"sr", "sra", "dr", "etc"},
+    "nl": {"dhr", "mevr", "dr", "bijv", "enz"},
+}
+
+_CONTROL_RE = re.compile(r'[\x00-\x1F\x7F-\x9F]')
+_CLOSERS = "\"'”’»)]」』"
+
+
+def normalize_text(text: str) -> str:
+    """Unicode NFC, control characters removed, whitespace collapsed"""
+    text = unicodedata.normalize("NFC", text)
+    text = ' '.join(text.split())
+    return _CONTROL_RE.sub('', text)
+
+
+@lru_cache(maxsize=None)
+def _patterns(base: str) -> Tuple[re.Pattern, re.Pattern]:
+    ends = re.escape(".!?…" + _SENTENCE_ENDS.get(base, ""))
+    closers = re.escape(_CLOSERS)
+    follow = "" if base in _NO_SPACE_LANGUAGES else r"(?=\s|$)"
+    sentence_re = re.compile(rf"\S.*?(?:[{ends}]+[{closers}]*{follow}|$)", re.DOTALL)
+    clause_re = re.compile(rf"[^{re.escape(_CLAUSE_MARKS)}]*[{re.escape(_CLAUSE_MARKS)}]+\s*|.+$", re.DOTALL)
+    return sentence_re, clause_re
+
+
+def _ends_with_abbreviation(sentence: str, base: str) -> bool:
+    if not sentence.endswith("."):
+        return False
+    last = sentence[:-1].rsplit(" ", 1)[-1].lower()
+    # Single-letter initials ("J. Smith") never end a sentence
+    return (len(last) == 1 and last.isalpha()) or last in _ABBREVIATIONS.get(base, ())
+
+
+def split_sentences(text: str, lang: str) -> List[str]:
+    """Split normalized text into sentences"""
+    base = lang.split("-")[0]
+    sentence_re, _ = _patterns(base)
+    sentences = []
+    pending = ""
+    for match in sentence_re.finditer(text):
+        sentence = (pending + " " + match.group().strip()).strip() if pending else match.group().strip()
+        if _ends_with_abbreviation(sentence, base):
+            pending = sentence
+            continue
+        pending = ""
+        sentences.append(sentence)
+    if pending:
+        sentences.append(pending)
+    return sentences
+
+
+def _split_long(sentence: str, max_chars: int, clause_re: re.Pattern) -> List[str]:
+    # Clause marks first, then spaces, then a hard cut (for unspaced scripts)
+    if len(sentence) <= max_chars:
+        return [sentence]
+    parts = []
+    for clause in (c.strip() for c in clause_re.findall(sentence)):
+        if not clause:
+            continue
+        if len(clause) <= max_chars:
+            parts.append(clause)
+            continue
+        words, current = clause.split(" "), ""
+        for word in words:
+            while len(word) > max_chars:
+                if current:
+                    parts.append(current)
+                    current = ""
+                parts.append(word[:max_chars])
+                word = word[max_chars:]
+            if current and len(current) + 1 + len(word) > max_chars:
+                parts.append(current)
+                current = word
+            else:
+                current = f"{current} {word}" if current else word
+        if current:
+            parts.append(current)
+    return _pack(parts, max_chars)
+
+
+def _pack(parts: List[str], max_chars: int) -> List[str]:
+    # Greedily join consecutive parts while they fit
+    chunks = []
+    for part in parts:
+        if chunks and len(chunks[-1]) + 1 + len(part) <= max_chars:
+            chunks[-1] = f"{chunks[-1]} {part}"
+        else:
+            chunks.append(part)
+    return chunks
+
+
+@lru_cache(maxsize=1024)
+def segment_text(text: str, lang: str, max_chars: int, merge: bool = False) -> Tuple[str, ...]:
+    """Sentence chunks of at most max_chars, stable for a given sentence
+
+    Every chunk lies within one sentence unless merge is set, in which case
+    consecutive short sentences are packed together up to max_chars (fewer
+    calls for engines with a high per-call cost). Results are memoized.
+    """
+    _, clause_re = _patterns(lang.split("-")[0])
+    chunks = []
+    for sentence in split_sentences(normalize_text(text), lang):
+        chunks.extend(_split_long(sentence, max_chars, clause_re))
+    return tuple(_pack(chunks, max_chars) if merge else chunks)
+
+
+class SentenceStream:
+    """Incremental segmentation of text that arrives in pieces (e.g. LLM tokens)
+
+    feed() returns chunks as soon as their sentence is known to be complete:
+    a terminator followed by whitespace (or, for unspaced scripts, the
+    terminator itself). A sentence that outgrows max_chars is released
+    clause by clause. flush() returns whatever is left.
+    """
+
+    def __init__(self, lang: str, max_chars: int):
+        self.lang = lang
+        self.max_chars = max_chars
+        self._base = lang.split("-")[0]
+        self._ends = ".!?…" + _SENTENCE_ENDS.get(self._base, "")
+        self._clause_re = _patterns(self._base)[1]
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        self._buffer += text
+        sentences = split_sentences(normalize_text(self._buffer), self.lang)
+        if not sentences:
+            return []
+        complete, last = sentences[:-1], sentences[-1]
+
+        spaced = self._buffer[-1:].isspace() or self._base in _NO_SPACE_LANGUAGES
+        if spaced and last.rstrip(_CLOSERS)[-1:] in tuple(self._ends) and not _ends_with_abbreviation(last, self._base):
+            complete.append(last)
+            last = ""
+        elif len(last) > self.max_chars:
+            parts = _split_long(last, self.max_chars, self._clause_re)
+            complete.extend(parts[:-1])
+            last = parts[-1]
+
+        # Keep the trailing space so the next piece does not fuse with this word
+        self._buffer = last + " " if last and self._buffer[-1:].isspace() else last
+        return [chunk for sentence in complete for chunk in _split_long(sentence, self.max_chars, self._clause_re)]
+
+    def flush(self) -> List[str]:
+        text, self._buffer = normalize_text(self._buffer), ""
+        return [
+            chunk for sentence in split_sentences(text, self.lang)
+            for chunk in _split_long(sentence, self.max_chars, self._clause_re)
+        ]
+
+    def reset(self) -> None:
+        self._buffer = ""
@@ -0,0 +1,194 @@
+"""Pluggable text-to-speech engines and per-language routing with latency fallback"""
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+import metrics
+from audio_buffer import AudioBuffer
+
+# Coqui VITS models used by the offline engine, per language
+LOCAL_TTS_MODELS = {
+    "en": "tts_models/en/ljspeech/vits",
+    "de": "tts_models/de/thorsten/vits",
+    "es": "tts_models/es/css10/vits",
+    "fr": "tts_models/fr/css10/vits",
+    "nl": "tts_models/nl/css10/vits",
+    "fi": "tts_models/fi/css10/vits",
+    "hu": "tts_models/hu/css10/vits",
+    "el": "tts_models/el/cv/vits",
+    "pl": "tts_models/pl/mai_female/vits",
+    "uk": "tts_models/uk/mai/vits",
+    "it": "tts_models/it/mai_female/vits",
+    "pt": "tts_models/pt/cv/vits",
+    "da": "tts_models/da/cv/vits",
+    "sv": "tts_models/sv/cv/vits",
+    "ro": "tts_models/ro/cv/vits",
+    "cs": "tts_models/cs/cv/vits",
+    "sk": "tts_models/sk/cv/vits",
+    "bn": "tts_models/bn/custom/vits-male",
+}
+
+# Engine order per language ("default" applies to unlisted languages).
+# Override with a JSON object in TTS_ENGINE_CONFIG, e.g. {"default": ["gtts", "local"]}
+ENGINE_CONFIG = json.loads(os.environ.get("TTS_ENGINE_CONFIG", '{"default": ["gtts", "local"]}'))
+
+# An engine whose recent latency (seconds per character of text) exceeds this
+# is passed over in favour of the next configured engine; the default allows
+# 3 s for a 100-character chunk
+ENGINE_LATENCY_BUDGET = float(os.environ.get("TTS_ENGINE_LATENCY_BUDGET", "0.03"))
+
+# Shorter texts are timed as if this long, so per-request overhead on short
+# phrases does not make an engine look slow
+LATENCY_MIN_CHARS = 20
+
+
+class TTSEngine:
+    """Interface implemented by every synthesis backend"""
+
+    name = "base"
+
+    def supports(self, lang: str) -> bool:
+        return True
+
+    def synthesize(self, text: str, lang: str) -> AudioBuffer:
+        raise NotImplementedError
+
+    def synthesize_mp3(self, text: str, lang: str) -> Optional[Tuple[bytes, AudioBuffer]]:
+        """Native MP3 output with the same audio as PCM, or None if the engine only produces PCM"""
+        return None
+
+
+class LocalTTSEngine(TTSEngine):
+    """Offline CPU synthesis with a lightweight Coqui VITS model per language"""
+
+    name = "local"
+
+    def __init__(self, models: Dict[str, str] = LOCAL_TTS_MODELS):
+        self.models = models
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def supports(self, lang: str) -> bool:
+        return lang.split("-")[0] in self.models
+
+    def _model(self, lang: str):
+        lang = lang.split("-")[0]
+        with self._lock:
+            if lang not in self._loaded:
+                from TTS.api import TTS
+                self._loaded[lang] = TTS(model_name=self.models[lang], progress_bar=False, gpu=False)
+            return self._loaded[lang]
+
+    def synthesize(self, text: str, lang: str) -> AudioBuffer:
+        tts = self._model(lang)
+        samples = np.asarray(tts.tts(text=text), dtype=np.float32)
+        return AudioBuffer(samples, tts.synthesizer.output_sample_rate)
+
+
+class ToneEngine(TTSEngine):
+    """Deterministic stand-in engine: a tone whose length follows the text"""
+
+    name = "tone"
+
+    def __init__(self, latency: float = 0.0, sample_rate: int = 24000, seconds_per_char: float = 0.06):
+        self.latency = latency
+        self.sample_rate = sample_rate
+        self.seconds_per_char = seconds_per_char
+
+    def synthesize(self, text: str, lang: str) -> AudioBuffer:
+        if self.latency:
+            time.sleep(self.latency)
+        n = max(1, int(self.sample_rate * self.seconds_per_char * len(text)))
+        t = np.arange(n, dtype=np.float32) / self.sample_rate
+        return AudioBuffer(0.3 * np.sin(2 * np.pi * 220 * t), self.sample_rate)
+
+
+class EngineRouter:
+    """Selects an engine per language from config, falling back on slowness or errors
+
+    Each (engine, language) pair keeps an exponentially weighted latency per
+    character, so long and short requests are compared on the same scale.
+    Engines over the latency budget are tried last (their estimate decays
+    each time they are passed over); failures move on to the next candidate.
+    """
+
+    def __init__(
+        self,
+        engines: List[TTSEngine],
+        config: Dict[str, List[str]] = ENGINE_CONFIG,
+        latency_budget: float = ENGINE_LATENCY_BUDGET
+    ):
+        self.engines = {engine.name: engine for engine in engines}
+        self.config = config
+        self.latency_budget = latency_budget
+        self._latency = {}
+        self._lock = threading.Lock()
+
+    def _configured(self, lang: str) -> List[TTSEngine]:
+        names = self.config.get(lang, self.config.get("default", list(self.engines)))
+        engines = [self.engines[name] for name in names if name in self.engines]
+        return [engine for engine in engines if engine.supports(lang)]
+
+    def primary(self, lang: str) -> Optional[str]:
+        """The configured first engine for a language, whatever its recent latency"""
+        engines = self._configured(lang)
+        return engines[0].name if engines else None
+
+    def candidates(self, lang: str) -> List[TTSEngine]:
+        """Engines to try for a language, in order"""
+        engines = self._configured(lang)
+        with self._lock:
+            slow = {e.name for e in engines if self._latency.get((e.name, lang), 0.0) > self.latency_budget}
+            # Decay the estimate of engines passed over so they get probed again later
+            for name in slow:
+                self._latency[(name, lang)] *= 0.95
+        return [e for e in engines if e.name not in slow] + [e for e in engines if e.name in slow]
+
+    def synthesize(self, text: str, lang: str) -> AudioBuffer:
+        return self.synthesize_with_engine(text, lang)[0]
+
+    def synthesize_with_engine(self, text: str, lang: str) -> Tuple[AudioBuffer, str]:
+        """(audio, name of the engine that produced it)"""
+        return self._run(lambda engine: engine.synthesize(text, lang), text, lang)
+
+    def synthesize_mp3(self, text: str, lang: str) -> Optional[Tuple[bytes, AudioBuffer]]:
+        """(MP3, PCM) straight from the primary engine, or None if it is passed over, only produces PCM or fails
+
+        On None, callers fall back to synthesize, which tries the remaining engines.
+        """
+        candidates = self.candidates(lang)
+        if (not candidates or candidates[0].name != self.primary(lang)
+                or type(candidates[0]).synthesize_mp3 is TTSEngine.synthesize_mp3):
+            return None
+        try:
+            return self._run(lambda engine: engine.synthesize_mp3(text, lang), text, lang, candidates[:1])[0]
+        except RuntimeError:
+            return None
+
+    def _run(self, synthesize, text: str, lang: str, candidates: Optional[List[TTSEngine]] = None) -> tuple:
+        # (result, engine name) from the first candidate that succeeds
+        errors = []
+        chars = max(len(text), LATENCY_MIN_CHARS)
+        for engine in candidates if candidates is not None else self.candidates(lang):
+            started = time.perf_counter()
+            try:
+                audio = synthesize(engine)
+            except Exception as e:
+                self._record(engine.name, lang, self.latency_budget * 2)
+                metrics.incr(f"tts_engine_{engine.name}_errors")
+                errors.append(f"{engine.name}: {e}")
+                continue
+            self._record(engine.name, lang, (time.perf_counter() - started) / chars)
+            metrics.incr(f"tts_engine_{engine.name}_requests")
+            return audio, engine.name
+        raise RuntimeError(f"No TTS engine succeeded for '{lang}': {'; '.join(errors) or 'none configured'}")
+
+    def _record(self, name: str, lang: str, seconds_per_char: float) -> None:
+        key = (name, lang)
+        with self._lock:
+            previous = self._latency.get(key)
+            self._latency[key] = seconds_per_char if previous is None else 0.8 * previous + 0.2 * seconds_per_char
+            metrics.set_gauge(f"tts_engine_{name}_latency_{lang}", self._latency[key])
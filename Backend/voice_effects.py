@@ -0,0 +1,180 @@
+"""Emotion presets defined as data and compiled into reusable effect plans"""
+from functools import lru_cache
+import numpy as np
+from scipy.signal import lfilter, sosfilt
+
+from audio_buffer import AudioBuffer
+
+# Effect parameters per emotion. Supported keys:
+#   speed            tempo factor (pitch preserved)
+#   gain_db          output gain
+#   pitch_semitones  resampling pitch shift, same as the intonation control
+#   eq               list of biquads: {"type": "peak"|"lowshelf"|"highshelf"|"highpass"|"lowpass",
+#                                      "freq": Hz, "gain_db": dB, "q": Q}
+EMOTION_PRESETS = {
+    "Happy": {"speed": 1.1, "gain_db": 3},
+    "Sad": {"speed": 0.9, "gain_db": -3},
+    "Angry": {"speed": 1.2, "gain_db": 5},
+    "Surprise": {"speed": 1.3, "gain_db": 8},
+    "Fear": {"speed": 1.4, "gain_db": -5},
+    "Disgust": {"speed": 0.8, "gain_db": -2},
+    "Neutral": {},
+}
+
+# Sample rates whose filter coefficients and stretch windows are prepared at startup
+COMMON_SAMPLE_RATES = (16000, 22050, 24000, 44100, 48000)
+
+# Tempo stretch frame length (seconds); synthesis hop is half a frame
+STRETCH_FRAME_SECONDS = 0.04
+
+
+def _biquad(kind: str, freq: float, sr: int, gain_db: float = 0.0, q: float = 0.707) -> np.ndarray:
+    """RBJ audio-EQ-cookbook biquad as a single second-order section"""
+    a = 10.0 ** (gain_db / 40.0)
+    w0 = 2.0 * np.pi * min(freq, 0.49 * sr) / sr
+    cos_w0, alpha = np.cos(w0), np.sin(w0) / (2.0 * q)
+
+    if kind == "peak":
+        b = [1 + alpha * a, -2 * cos_w0, 1 - alpha * a]
+        den = [1 + alpha / a, -2 * cos_w0, 1 - alpha / a]
+    elif kind in ("lowshelf", "highshelf"):
+        sign = 1 if kind == "lowshelf" else -1
+        sq = 2 * np.sqrt(a) * alpha
+        b = [a * ((a + 1) - sign * (a - 1) * cos_w0 + sq),
+             sign * 2 * a * ((a - 1) - sign * (a + 1) * cos_w0),
+             a * ((a + 1) - sign * (a - 1) * cos_w0 - sq)]
+        den = [(a + 1) + sign * (a - 1) * cos_w0 + sq,
+               -sign * 2 * ((a - 1) + sign * (a + 1) * cos_w0),
+               (a + 1) + sign * (a - 1) * cos_w0 - sq]
+    elif kind == "highpass":
+        b = [(1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2]
+        den = [1 + alpha, -2 * cos_w0, 1 - alpha]
+    elif kind == "lowpass":
+        b = [(1 - cos_w0) / 2, 1 - cos_w0, (1 - cos_w0) / 2]
+        den = [1 + alpha, -2 * cos_w0, 1 - alpha]
+    else:
+        raise ValueError(f"Unknown EQ type: {kind}")
+
+    return np.array(b + den) / den[0]
+
+
+@lru_cache(maxsize=None)
+def stretch_window(sr: int) -> np.ndarray:
+    """Periodic Hann window used by the overlap-add tempo stretch"""
+    frame = 2 * max(1, int(sr * STRETCH_FRAME_SECONDS) // 2)
+    return np.hanning(frame + 1)[:-1].astype(np.float32)
+
+
+def time_stretch(samples: np.ndarray, sr: int, speed: float) -> np.ndarray:
+    """Change tempo without changing pitch (overlap-add, 50% synthesis overlap)
+
+    samples is a float array of shape (n, channels).
+    """
+    window = stretch_window(sr)
+    frame = len(window)
+    hop_out = frame // 2
+    n_out = int(round(len(samples) / speed))
+    n_frames = -(-n_out // hop_out) + 1
+
+    span = int(np.ceil((n_frames - 1) * hop_out * speed)) + 2 * frame
+    padded = np.zeros((max(span, len(samples) + 2 * frame), samples.shape[1]), dtype=np.float32)
+    padded[hop_out:hop_out + len(samples)] = samples
+    starts = np.round(np.arange(n_frames) * hop_out * speed).astype(np.int64)
+
+    out = np.zeros(((n_frames + 1) * hop_out, samples.shape[1]), dtype=np.float32)
+    for i, start in enumerate(starts):
+        out[i * hop_out:i * hop_out + frame] += padded[start:start + frame] * window[:, None]
+    return out[hop_out:hop_out + n_out]
+
+
+def pitch_shift(buf: AudioBuffer, semitones: float) -> AudioBuffer:
+    """Resampling pitch shift: plays the clip 2^(semitones/12) faster"""
+    ratio = 2.0 ** (semitones / 12.0)
+    n_out = max(1, int(len(buf) / ratio))
+    positions = np.arange(n_out, dtype=np.float64) * ratio
+    src = np.arange(len(buf))
+    out = np.empty((n_out, buf.channels), dtype=np.float32)
+    for ch in range(buf.channels):
+        out[:, ch] = np.interp(positions, src, buf.samples[:, ch])
+    return buf.with_samples(out)
+
+
+def high_pass(buf: AudioBuffer, cutoff: float) -> AudioBuffer:
+    """First-order RC high-pass filter (same response as pydub's high_pass_filter)"""
+    rc = 1.0 / (2.0 * np.pi * cutoff)
+    dt = 1.0 / buf.sample_rate
+    alpha = rc / (rc + dt)
+    return buf.with_samples(lfilter([alpha, -alpha], [1.0, -alpha], buf.samples, axis=0))
+
+
+def apply_gain(buf: AudioBuffer, gain_db: float) -> AudioBuffer:
+    """Scale by gain_db, saturating at full scale"""
+    out = buf.samples * np.float32(10.0 ** (gain_db / 20.0))
+    np.clip(out, -1.0, 1.0, out=out)
+    return buf.with_samples(out)
+
+
+class EffectPlan:
+    """Compiled form of one emotion preset
+
+    Filter coefficients are prepared per sample rate and reused, and the
+    preset's speed/pitch/gain are merged with the caller's own controls so
+    each effect runs once per request.
+    """
+
+    def __init__(self, name: str, speed: float = 1.0, gain_db: float = 0.0,
+                 pitch_semitones: float = 0.0, eq=()):
+        self.name = name
+        self.speed = speed
+        self.gain_db = gain_db
+        self.pitch_semitones = pitch_semitones
+        self.eq = tuple(dict(band) for band in eq)
+        self._sos = {}
+
+    def prepare(self, sample_rates=COMMON_SAMPLE_RATES) -> "EffectPlan":
+        """Precompute filter coefficients and stretch windows"""
+        for sr in sample_rates:
+            self.sos(sr)
+            stretch_window(sr)
+        return self
+
+    def sos(self, sr: int):
+        """Second-order sections for this plan's EQ at a sample rate (None if flat)"""
+        if sr not in self._sos:
+            self._sos[sr] = np.vstack([
+                _biquad(band["type"], band["freq"], sr, band.get("gain_db", 0.0), band.get("q", 0.707))
+                for band in self.eq
+            ]) if self.eq else None
+        return self._sos[sr]
+
+    def apply_tempo_pitch(self, buf: AudioBuffer, speed: float = 1.0,
+                          pitch_semitones: float = 0.0) -> AudioBuffer:
+        """Apply the merged pitch shift and tempo change"""
+        shift = self.pitch_semitones + pitch_semitones
+        if shift:
+            buf = pitch_shift(buf, shift)
+
+        total_speed = self.speed * speed
+        if total_speed != 1.0:
+            buf = buf.with_samples(time_stretch(buf.samples, buf.sample_rate, total_speed))
+        return buf
+
+    def apply_eq(self, buf: AudioBuffer) -> AudioBuffer:
+        """Run the preset's EQ filters"""
+        sos = self.sos(buf.sample_rate)
+        if sos is None:
+            return buf
+        return buf.with_samples(sosfilt(sos, buf.samples, axis=0))
+
+    def apply_gain(self, buf: AudioBuffer, gain_db: float = 0.0) -> AudioBuffer:
+        """Apply the merged output gain"""
+        total = self.gain_db + gain_db
+        return apply_gain(buf, total) if total else buf
+
+
+def compile_presets(presets: dict = EMOTION_PRESETS) -> dict:
+    """Compile every preset into a prepared EffectPlan"""
+    return {name: EffectPlan(name, **params).prepare() for name, params in presets.items()}
+
+
+EMOTION_PLANS = compile_presets()
@@ -0,0 +1,130 @@
+"""Memory-mapped WAV reading
+
+The data chunk of a PCM or float WAV is exposed as a read-only NumPy view
+on a memory map, so opening a file costs a header parse and only the
+pages a caller actually touches are read from disk: a detection window or
+an effect's time slice of a long file does not pull in the rest of it.
+Formats the view cannot express (24-bit, compressed) raise ValueError so
+callers can fall back to a decoder.
+"""
+import mmap
+import struct
+from typing import Optional
+
+import numpy as np
+
+_WAVE_FORMAT_PCM = 1
+_WAVE_FORMAT_IEEE_FLOAT = 3
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# (format tag, bits per sample) -> sample dtype
+_DTYPES = {
+    (_WAVE_FORMAT_PCM, 8): np.dtype("u1"),
+    (_WAVE_FORMAT_PCM, 16): np.dtype("<i2"),
+    (_WAVE_FORMAT_PCM, 32): np.dtype("<i4"),
+    (_WAVE_FORMAT_IEEE_FLOAT, 32): np.dtype("<f4"),
+    (_WAVE_FORMAT_IEEE_FLOAT, 64): np.dtype("<f8"),
+}
+
+
+class MappedWav:
+    """A WAV file whose samples are a zero-copy (frames, channels) view
+
+    Use as a context manager; views taken from pcm must not outlive it.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        try:
+            try:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError("Empty file")
+            try:
+                fmt, offset, size = self._parse()
+            except struct.error:
+                raise ValueError("Truncated WAV header")
+        except Exception:
+            self.close()
+            raise
+        tag, self.channels, self.sample_rate, bits = fmt
+        self.dtype = _DTYPES.get((tag, bits))
+        if self.dtype is None:
+            self.close()
+            raise ValueError(f"Unsupported WAV encoding (format {tag}, {bits} bits)")
+        frames = size // (self.dtype.itemsize * self.channels)
+        self.pcm = np.frombuffer(
+            self._map, dtype=self.dtype, count=frames * self.channels, offset=offset
+        ).reshape(frames, self.channels)
+
+    def _parse(self) -> tuple:
+        # ((format tag, channels, sample rate, bits), data offset, data size)
+        m = self._map
+        if len(m) < 12 or m[0:4] != b"RIFF" or m[8:12] != b"WAVE":
+            raise ValueError("Not a RIFF/WAVE file")
+        fmt = None
+        pos = 12
+        while pos + 8 <= len(m):
+            chunk_id, size = struct.unpack_from("<4sI", m, pos)
+            body = pos + 8
+            if chunk_id == b"fmt ":
+                tag, channels, sample_rate, _, _, bits = struct.unpack_from("<HHIIHH", m, body)
+                if tag == _WAVE_FORMAT_EXTENSIBLE and size >= 26:
+                    tag = struct.unpack_from("<H", m, body + 24)[0]
+                if channels == 0:
+                    raise ValueError("WAV file has no channels")
+                fmt = (tag, channels, sample_rate, bits)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise ValueError("WAV data chunk before fmt chunk")
+                # Streamed writers may leave the size unset; the file end bounds it
+                return fmt, body, min(size, len(m) - body)
+            pos = body + size + (size & 1)
+        raise ValueError("WAV file has no data chunk")
+
+    @property
+    def frames(self) -> int:
+        return len(self.pcm)
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.sample_rate
+
+    def window(self, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        """Zero-copy view of frames [start, end)"""
+        return self.pcm[start:end]
+
+    def samples(self, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        """Frames [start, end) as float32 in [-1, 1); only this window is read and converted"""
+        pcm = self.window(start, end)
+        if self.dtype.kind == "f":
+            return pcm.astype(np.float32)
+        if self.dtype.kind == "u":
+            return (pcm.astype(np.float32) - 128.0) * np.float32(1.0 / 128.0)
+        return pcm.astype(np.float32) * np.float32(1.0 / (1 << (8 * self.dtype.itemsize - 1)))
+
+    def close(self) -> None:
+        mapped = getattr(self, "_map", None)
+        if mapped is not None:
+            self.pcm = None
+            try:
+                mapped.close()
+            except BufferError:
+                # A caller still holds a view; the map is released with it
+                pass
+        self._file.close()
+
+    def __enter__(self) -> "MappedWav":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def is_mappable_wav(path) -> bool:
+    """Whether MappedWav can read a file (a header check; no samples are read)"""
+    try:
+        MappedWav(path).close()
+        return True
+    except (ValueError, OSError):
+        return False